@@ -1,9 +1,25 @@
 import os
 import pandas as pd
 from datetime import datetime
-
-
-def find_duplicates_and_missing_data(input_file, expected_count=None):
+from Components.data_processing import (build_duplicate_index,
+                                         duplicate_clusters,
+                                         find_duplicate_ids, flag_duplicates,
+                                         flagging_reasons, to_categoricals)
+from Components.designators import (INCORRECT_DESIGNATOR_REASONS,
+                                    near_duplicate_designators,
+                                    suggest_designators, validate_designators)
+from Components.file_io import read_excel_file
+from Components.identities import IDENTITY_OTHER_SITE_RULE, identity_rules
+from Components.identity_index import IDENTITY_INDEX_FILE, IdentityIndex
+from Components.incremental import site_name, snapshot_date
+from Components.sites import DEFAULT_SITE, detect_site, site_profile
+
+
+def find_duplicates_and_missing_data(input_file,
+                                     expected_count=None,
+                                     categoricals=None,
+                                     site=None,
+                                     identity_index=IDENTITY_INDEX_FILE):
   """
     This function identifies and processes
     duplicate records, missing data, and 
@@ -22,9 +38,15 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
 
     Args:
         input_file (str): Path to the input Excel file.
+        categoricals (list): Columns to load as categoricals, defaults
+            to the site's list (see SiteProfile.categorical_columns).
+        site (str): Name of the site's profile (see Components.sites),
+            detected from the Location column by default.
+        identity_index (str): SQLite file shared by all sites' runs (see
+            Components.identity_index), None skips the cross-site check.
 
     Returns:
-        None
+        DataFrame: The flagged records written to the CSV file.
     """
   # Get the current date
   current_date = datetime.now().strftime('%Y-%m-%d')
@@ -33,115 +55,86 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
   current_time = datetime.now().strftime('%H%M%S')
 
   # Read the Excel file
-  df = pd.read_excel(input_file, skiprows=1)
+  df = read_excel_file(input_file, skiprows=1)
+
+  # Load the site's profile
+  profile = detect_site(df) if site is None else site_profile(site)
+  print(f'Site: {profile.name}')
 
   # Clean up 'Flr Pln D' column by removing leading and trailing spaces
   df['Flr Pln D'] = df['Flr Pln D'].str.strip()
 
-  # Check for incorrect designators
-  # old line with cool code (worth looking into):
-  # incorrect_designators = df[~df['Flr Pln D'].str.match(r'^[A-Z]\d+$')]
-  # Doesn't work with empty entries. Implementation requires catching exceptions.
-
-  # Check for incorrect designators
-  incorrect_designators = []
-  for index, row in df.iterrows():
-
-    designator = row['Flr Pln D']
-    epic_loc = row['EPIC_LOC']
-
-    # Logic for checking incorrect designators:
-    # if (not designator[0].isalpha() or not designator[1:].isdigit()):
-    # Check if epic_loc is not n/a (i.e. it is a number or str)
-    # Using the value will throw an error if it's n/a.
-    # Skip the entry if EPIC has classified the device as remote in the epic_loc column
-    #
-    if pd.notna(epic_loc) and isinstance(epic_loc,
-                                         str) and 'remote' in epic_loc.lower():
-      continue  # Skip records where 'remote' is present in 'EPIC_LOC'
-
-    # After skipping remote devices without a designator,
-    # Check that the designator is not a n/a value.
-    # If it's not a n/a value and doesn't start with
-    # the letters of the five device types
-    # or it doesn't proceed to be a number after the first character
-    # then it's an incorrect designator.
-
-    # Currently the script only looks for the first character to be a letter,
-    # and it doesn't match the current number system:
-    # Current number system: W2006, WOW2018
-    # Old Design: W6, WOW18
-
-    if pd.notna(designator) and (not isinstance(designator, str)
-                                 or not designator[0].isalpha()
-                                 or not designator[1:].isdigit()):
-      incorrect_designators.append(index)
+  # Store repeated values like the floor plan URLs once per column
+  memory_before = df.memory_usage(deep=True).sum()
+  if categoricals is None:
+    categoricals = profile.categorical_columns
+  converted = to_categoricals(df, categoricals)
+  print(f'Categorical columns: {", ".join(converted)} '
+        f'({memory_before / 1e6:.1f} MB -> '
+        f'{df.memory_usage(deep=True).sum() / 1e6:.1f} MB)')
+
+  # Check for incorrect designators in one vectorized pass.
+  # Old (W6, WOW18) and new (W2006, WOW2018) numbering are both valid,
+  # blanks are left to the missing data checks, and records EPIC
+  # classifies as remote in the EPIC_LOC column are skipped. Sites that
+  # only use one numbering flag designators in the other. Prefixes
+  # other than the device classes and the site's own are flagged.
+  designator_checks = validate_designators(df['Flr Pln D'], df['EPIC_LOC'],
+                                           profile.designator_schemes,
+                                           profile.designator_prefixes)
+  df['Designator Check'] = designator_checks['reason']
+  incorrect_designators = df.index[designator_checks['reason'].isin(
+      INCORRECT_DESIGNATOR_REASONS)].tolist()
 
   incorrect_designators_df = pd.DataFrame(
       incorrect_designators, columns=['Incorrect Designator Index'])
-  '''
-  # Suggest corrections
-  for idx in incorrect_designators:
-    sequence = df.loc[(df['Flr Pln N'] == df.loc[idx, 'Flr Pln N'])
-                      & (df['Flr Pln L'] == df.loc[idx, 'Flr Pln L'])]
-    new_designator = (
-        f'{sequence["Flr Pln D"].str.extract("([A-Z]+)")[0].max()}'
-        f'{sequence["Flr Pln D"].str.extract("([0-9]+)")[0].astype(int).max() + 1}'
-    )
-
-    df.loc[idx, 'Suggested Designator'] = new_designator
-  '''
-
-  def find_duplicate_id(row, df):
-    # Find the ID of the record causing a duplicate.
-
-    designator = row['Flr Pln D']
-    department = row['Department']
-    newFlrPln = row['Flr Pln N']
-    oldFlrPln = row['Flr Pln L']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Flr Pln N'
-    if pd.notna(designator) and pd.notna(newFlrPln):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Flr Pln N'] == newFlrPln)].iloc[0]
-      return duplicate_row['ID']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Flr Pln L'
-    if pd.notna(designator) and pd.notna(oldFlrPln):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Flr Pln L'] == oldFlrPln)].iloc[0]
-      return duplicate_row['ID']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Department'
-    if pd.notna(designator) and pd.notna(department):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Department'] == department)].iloc[0]
-      return duplicate_row['ID']
-
-    return None
-
-  # Find records where both 'Flr Pln N' and 'Flr Pln D', New URL and Designator,
-  # match on two or more occurrences
-  duplicates_n_d = df.groupby(['Flr Pln N',
-                               'Flr Pln D']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Department', Department and Designator,
-  # match on two or more occurrences
-  duplicates_d_dept = df.groupby(['Flr Pln D',
-                                  'Department']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Flr Pln L', Old URL and Designator,
-  # match on two or more occurrences
-  dupe_d_l = df.groupby(['Flr Pln D',
-                         'Flr Pln L']).filter(lambda x: len(x) >= 2)
-
-  # Concatenate the results
-  duplicates = pd.concat([duplicates_n_d, duplicates_d_dept, dupe_d_l],
-                         ignore_index=True)
+
+  # Suggest the next free designator of the record's floor plans and
+  # prefix for every incorrect, missing or duplicated designator
+  df['Suggested Designator'] = suggest_designators(
+      df, profile.designator_prefixes, df['Designator Check'])
+
+  # Flag records that share a designator with another record on the
+  # New URL, the Old URL or the Department in one vectorized pass.
+  # 'Duplicate Rules' holds a bitmask of which of those pairs matched,
+  # so a record matching several pairs is only listed once.
+  df['Duplicate Rules'] = flag_duplicates(df)
+  duplicates = df[df['Duplicate Rules'] != 0].copy()
 
   # Add a new column 'Duplicate_of_ID' to store the ID of the record causing a duplicate
-  duplicates['Duplicate_of_ID'] = duplicates.apply(
-      lambda row: find_duplicate_id(row, df), axis=1)
+  # The index is built once per run; each duplicate is then an O(1) lookup
+  duplicate_index = build_duplicate_index(df)
+  duplicates['Duplicate_of_ID'] = find_duplicate_ids(duplicates, duplicate_index)
+
+  # Group duplicates of duplicates, on the designator pairs as well as
+  # Serial and Hostname, into numbered clusters
+  clusters = duplicate_clusters(df)
+  duplicates[clusters.columns] = clusters.loc[duplicates.index]
+
+  # Find designators that only differ from another one on the same
+  # floor plan by case, spacing, a look-alike letter or a single typo
+  # (W 2006, w2006, W20O6 for W2006)
+  df['Near Duplicate Of'] = near_duplicate_designators(
+      df, site_prefixes=profile.designator_prefixes)
+  near_duplicates = df[df['Near Duplicate Of'].notna()]
+
+  # Check that Serial, Hostname and Tag each identify one device:
+  # duplicates, and serials listed with different hostnames or tags.
+  # 'Identity Rules' holds a bitmask (see identities.identity_rules)
+  df['Identity Rules'] = identity_rules(df)
+
+  # Record this export's identifiers in the index shared by all sites
+  # and look them up in the other sites' latest exports in bulk
+  if identity_index is not None:
+    # Exports of an undetected site are told apart by their file name
+    index_site = (site_name(input_file)
+                  if profile is DEFAULT_SITE else profile.name)
+    with IdentityIndex(identity_index) as index:
+      df['Other Sites'] = index.check(df, index_site,
+                                      snapshot_date(input_file))
+    df.loc[df['Other Sites'].notna(),
+           'Identity Rules'] |= IDENTITY_OTHER_SITE_RULE[0]
+  identity_issues = df[df['Identity Rules'] != 0]
 
   # Find records with missing data in the Floor Plan URL column (e.g., 'Flr Pln N')
   missing_FlrPlnN = df[df['Flr Pln N'].isna()]
@@ -161,6 +154,8 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
   # Check the length of each dataframe
   print(f'Incorrect Designators: {len(incorrect_designators_df)}')
   print(f'Duplicates: {len(duplicates)}')
+  print(f'Near-duplicate Designators: {len(near_duplicates)}')
+  print(f'Identity Issues: {len(identity_issues)}')
   print(f'Missing Data: {len(missing_FlrPlnN)}')
   print(f'Entries to Include: {len(entries_to_include)}')
 
@@ -168,6 +163,8 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
   combined_data = pd.concat([
       df.loc[incorrect_designators_df['Incorrect Designator Index']],
       duplicates,
+      near_duplicates,
+      identity_issues,
       missing_FlrPlnN,
       entries_to_include,
   ],
@@ -182,61 +179,9 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
     # Add a new column 'Flr Pln D String' to store 'Flr Pln D' as strings
     combined_data['Flr Pln D String'] = combined_data['Flr Pln D'].astype(str)
 
-    # Define a function to determine flagging reason
-    def determine_flagging_reason(row):
-      reasons = []
-      # There are 8 flagging reasons
-      # 1) Blank Flr Pln N
-      # 2) Blank Flr Pln L
-      # 3) Dupe based on Department and Designator
-      # 4) Dupe based on Flr Pln D and Old Floor Plan, Flr Pln L
-      # 5) Dupe based on Flr Pln D and Old Floor Plan, Flr Pln N
-      # 6) Incorrect Monitor Info for one reason or another
-      # 7) Designator doesn't match given formats
-      # 8) Flags remaining records as, "Correct"
-
-      # 1)
-      if not pd.notna(row['Flr Pln N']):
-        reasons.append('Missing New Floor Plan')
-      # 2)
-      if not pd.notna(row['Flr Pln L']):
-        reasons.append('Missing Old Floor Plan')
-      # 3)
-      if pd.notna(row['Flr Pln D']) and pd.notna(row['Department']):
-        reasons.append('Duplicate based on Designator and Department')
-      # 4)
-      if pd.notna(row['Flr Pln D']) and pd.notna(row['Flr Pln L']):
-        reasons.append('Duplicate based on Designator and Old Floor Plan')
-      # 5)
-      if pd.notna(row['Flr Pln D']) and pd.notna(row['Flr Pln N']):
-        reasons.append('Duplicate based on Designator and New Floor Plan')
-
-      flr_pln_d = row['Flr Pln D String']
-
-      # 6)
-      if flr_pln_d.startswith(
-          ('L', 'W')) and (not pd.notna(row['WS_Mon_Make_1'])
-                           or not pd.notna(row['WS_Mon_Mod_1'])):
-        reasons.append('Incorrect Monitor Info')
-
-      # 7)
-      if not isinstance(
-          flr_pln_d,
-          str) or not flr_pln_d[0].isalpha() or not flr_pln_d[1:].isdigit():
-        reasons.append('Incorrect Designator Info')
-
-      # 8)
-      if not isinstance(flr_pln_d, str):
-        return 'moo'
-
-      if reasons:
-        return ', '.join(reasons)
-      else:
-        return 'Unknown Reason'
-
-    # Apply the function to create the flagging reason column
-    combined_data['Flagging Reason'] = combined_data.apply(
-        determine_flagging_reason, axis=1)
+    # Evaluate the flagging reasons (see data_processing.FLAGGING_REASONS)
+    # as column masks and build the reason text of every record at once
+    combined_data['Flagging Reason'] = flagging_reasons(combined_data)
 
     # Add a new column 'Reasons' to store flagging reasons
     combined_data.insert(0, 'Reasons to Correct Entry',
@@ -258,7 +203,10 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
     # Inform the user about the generated CSV file
     print(f'CSV file "{output_file_name}" generated successfully.')
 
+  return combined_data
+
 
-# Example usage
-input_file = 'PBMC EOD 12.19.23.xlsx'
-find_duplicates_and_missing_data(input_file)
+if __name__ == "__main__":
+  # Example usage
+  input_file = 'PBMC EOD 12.19.23.xlsx'
+  find_duplicates_and_missing_data(input_file)
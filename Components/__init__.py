@@ -0,0 +1 @@
+# Shared building blocks for the ITAM discrepancy scripts.
@@ -0,0 +1,302 @@
+import numpy as np
+import pandas as pd
+
+from Components.designators import INCORRECT_DESIGNATOR_REASONS
+from Components.identities import identity_reasons, normalize_identifiers
+
+# Column pairs that make two records duplicates of each other:
+# designator + new floor plan, designator + old floor plan,
+# designator + department. The order is the lookup precedence
+# used when resolving the ID a duplicate conflicts with.
+DUPLICATE_KEYS = [
+    ('Flr Pln D', 'Flr Pln N'),
+    ('Flr Pln D', 'Flr Pln L'),
+    ('Flr Pln D', 'Department'),
+]
+
+# Bit set in the 'Duplicate Rules' column for each duplicate key pair
+DUPLICATE_NEW_FLOOR_PLAN = 1
+DUPLICATE_OLD_FLOOR_PLAN = 2
+DUPLICATE_DEPARTMENT = 4
+DUPLICATE_RULE_BITS = dict(
+    zip(DUPLICATE_KEYS, [
+        DUPLICATE_NEW_FLOOR_PLAN, DUPLICATE_OLD_FLOOR_PLAN,
+        DUPLICATE_DEPARTMENT
+    ]))
+
+
+def to_categoricals(df, columns, max_unique_ratio=0.5):
+  """
+    Convert low-cardinality columns to categoricals in place.
+
+    Columns missing from the export are skipped, as are columns with
+    more than max_unique_ratio distinct values per row, which would
+    not get any smaller.
+
+    Args:
+        df (DataFrame): The ITAM export.
+        columns (list): Columns to convert.
+        max_unique_ratio (float): Highest distinct values / rows ratio
+            a column may have to be converted.
+
+    Returns:
+        list: The converted columns.
+  """
+  converted = []
+  for column in columns:
+    if column not in df or isinstance(df[column].dtype, pd.CategoricalDtype):
+      continue
+    if df[column].nunique() > max_unique_ratio * len(df):
+      continue
+    df[column] = df[column].astype('category')
+    converted.append(column)
+  return converted
+
+
+def build_duplicate_index(df, id_column='ID'):
+  """
+    Build a composite-key index of the first record for every
+    duplicate key pair, so duplicate IDs resolve in O(1).
+
+    Args:
+        df (DataFrame): The full ITAM export.
+        id_column (str): Column holding the record ID.
+
+    Returns:
+        dict: {key pair: {(value, value): first ID}}
+  """
+  duplicate_index = {}
+  for key in DUPLICATE_KEYS:
+    # Rows with a blank in either column never take part in a lookup
+    firsts = df.dropna(subset=list(key)).drop_duplicates(subset=list(key),
+                                                         keep='first')
+    duplicate_index[key] = dict(
+        zip(zip(firsts[key[0]], firsts[key[1]]), firsts[id_column]))
+  return duplicate_index
+
+
+def find_duplicate_ids(records, duplicate_index):
+  """
+    Find the ID of the record causing each duplicate.
+
+    The first key pair with no blanks decides the lookup, and the ID
+    returned is the first occurrence of that pair in the export.
+
+    Args:
+        records (DataFrame): Duplicate records to resolve.
+        duplicate_index (dict): Output of build_duplicate_index().
+
+    Returns:
+        list: The conflicting ID for every record, or None.
+  """
+  columns = {
+      name: records[name].tolist()
+      for key in DUPLICATE_KEYS for name in key
+  }
+  duplicate_ids = []
+  for position in range(len(records)):
+    duplicate_id = None
+    for key in DUPLICATE_KEYS:
+      values = (columns[key[0]][position], columns[key[1]][position])
+      if pd.notna(values[0]) and pd.notna(values[1]):
+        duplicate_id = duplicate_index[key].get(values)
+        break
+    duplicate_ids.append(duplicate_id)
+  return duplicate_ids
+
+
+def flag_duplicates(df):
+  """
+    Flag duplicate records for every duplicate key pair in one pass.
+
+    Group sizes are computed with a vectorized transform instead of
+    filtering each group through a Python lambda. A row is a duplicate
+    for a key pair when two or more rows share both values; rows with
+    a blank in either column are never duplicates.
+
+    Args:
+        df (DataFrame): The full ITAM export.
+
+    Returns:
+        Series: Bitmask of the DUPLICATE_* rules each row fired, 0 if none.
+  """
+  rules = pd.Series(0, index=df.index, dtype='int64')
+  for key, bit in DUPLICATE_RULE_BITS.items():
+    # observed=True keeps categorical keys from expanding to every
+    # combination of categories
+    group_sizes = df.groupby(list(key), sort=False,
+                             observed=True)[key[0]].transform('size')
+    rules[group_sizes.ge(2)] |= bit
+  return rules
+
+
+# Keys that put two records in the same duplicate cluster: the
+# designator pairs of DUPLICATE_KEYS and the device's own identifiers
+CLUSTER_KEYS = DUPLICATE_KEYS + [('Serial', ), ('Hostname', )]
+
+
+class UnionFind:
+  """
+    Disjoint sets over the positions 0..size-1, with path halving and
+    union by size, so any number of unions and finds is near-linear.
+  """
+
+  def __init__(self, size):
+    self.parent = list(range(size))
+    self.size = [1] * size
+
+  def find(self, item):
+    parent = self.parent
+    while parent[item] != item:
+      parent[item] = parent[parent[item]]
+      item = parent[item]
+    return item
+
+  def union(self, first, second):
+    first, second = self.find(first), self.find(second)
+    if first == second:
+      return first
+    if self.size[first] < self.size[second]:
+      first, second = second, first
+    self.parent[second] = first
+    self.size[first] += self.size[second]
+    return first
+
+
+def duplicate_clusters(df, keys=CLUSTER_KEYS):
+  """
+    Group records that are duplicates of each other, directly or through
+    other records: a record sharing its designator and floor plan with a
+    second one, which shares its Serial with a third one, puts all three
+    in one cluster.
+
+    Each key joins the records sharing its values (normalized with
+    normalize_identifiers) to the first of them, so every key costs one
+    groupby and one union per record. Blank values never match, and
+    keys with a column missing from df are skipped.
+
+    Args:
+        df (DataFrame): The ITAM export.
+        keys (list): Column tuples to match records on.
+
+    Returns:
+        DataFrame: Indexed like df, with a 'Duplicate Cluster' column
+        numbering the clusters from 1 in order of their first record
+        (0 for records without a duplicate) and a 'Cluster Size' column.
+  """
+  sets = UnionFind(len(df))
+  positions = np.arange(len(df))
+  for key in keys:
+    if any(column not in df for column in key):
+      continue
+    values = pd.DataFrame(
+        {column: normalize_identifiers(df[column]).values
+         for column in key})
+    codes = values.groupby(list(key), sort=False).ngroup().to_numpy()
+    # Records with a blank value get no group
+    keyed = codes >= 0
+    firsts = pd.Series(positions[keyed]).groupby(
+        codes[keyed]).transform('first').to_numpy()
+    for position, first in zip(positions[keyed], firsts):
+      if position != first:
+        sets.union(position, first)
+
+  roots = [sets.find(position) for position in positions]
+  sizes = [sets.size[root] for root in roots]
+  numbers = {}
+  clusters = []
+  for root, size in zip(roots, sizes):
+    if size > 1:
+      clusters.append(numbers.setdefault(root, len(numbers) + 1))
+    else:
+      clusters.append(0)
+  return pd.DataFrame({
+      'Duplicate Cluster': clusters,
+      'Cluster Size': sizes
+  },
+                      index=df.index)
+
+
+# Flagging reasons of the discrepancy CSV, in the order they are listed.
+# Records none of them apply to are flagged NO_FLAGGING_REASON.
+FLAGGING_REASONS = [
+    'Missing New Floor Plan',
+    'Missing Old Floor Plan',
+    'Duplicate based on Designator and Department',
+    'Duplicate based on Designator and Old Floor Plan',
+    'Duplicate based on Designator and New Floor Plan',
+    'Incorrect Monitor Info',
+    'Incorrect Designator Info',
+    'Near-duplicate Designator',
+] + [reason for bit, reason in identity_reasons()]
+NO_FLAGGING_REASON = 'Unknown Reason'
+
+
+def flagging_reason_masks(records):
+  """
+    Evaluate every flagging reason as a column mask.
+
+    Args:
+        records (DataFrame): Flagged records, with the 'Designator
+            Check' reason of designators.validate_designators().
+
+    Returns:
+        list: One boolean Series per entry of FLAGGING_REASONS.
+  """
+  designators = records['Flr Pln D']
+  has_designator = designators.notna()
+  missing_monitor = records['WS_Mon_Make_1'].isna(
+  ) | records['WS_Mon_Mod_1'].isna()
+  # Designators each record nearly duplicates, if it was checked (see
+  # designators.near_duplicate_designators)
+  near_duplicates = records.get('Near Duplicate Of',
+                                pd.Series(None, index=records.index,
+                                          dtype=object))
+  # Bitmask of Components.identities.identity_rules(), if it was checked
+  identity = records.get('Identity Rules',
+                         pd.Series(0, index=records.index)).fillna(0).astype(
+                             'int64')
+  return [
+      # 1) Blank Flr Pln N
+      records['Flr Pln N'].isna(),
+      # 2) Blank Flr Pln L
+      records['Flr Pln L'].isna(),
+      # 3) Dupe based on Department and Designator
+      has_designator & records['Department'].notna(),
+      # 4) Dupe based on Flr Pln D and Old Floor Plan, Flr Pln L
+      has_designator & records['Flr Pln L'].notna(),
+      # 5) Dupe based on Flr Pln D and New Floor Plan, Flr Pln N
+      has_designator & records['Flr Pln N'].notna(),
+      # 6) Laptop or workstation missing its monitor make or model
+      designators.astype(object).str.startswith(
+          ('L', 'W'), na=False).astype(bool) & missing_monitor,
+      # 7) Designator doesn't match given formats
+      records['Designator Check'].isin(INCORRECT_DESIGNATOR_REASONS),
+      # 8) Designator nearly duplicates another one on its floor plan
+      near_duplicates.notna(),
+      # 9) and on) Serial, Hostname or Tag not identifying one device
+  ] + [(identity & bit).ne(0) for bit, reason in identity_reasons()]
+
+
+def flagging_reasons(records):
+  """
+    Build the 'Flagging Reason' text of every record in bulk.
+
+    Each record's reasons are packed into a bitmask, and the text is
+    joined once per distinct combination instead of once per record.
+
+    Args:
+        records (DataFrame): Flagged records, see flagging_reason_masks().
+
+    Returns:
+        Series: Comma separated reasons, indexed like records.
+  """
+  codes = np.zeros(len(records), dtype=np.int64)
+  for bit, mask in enumerate(flagging_reason_masks(records)):
+    codes |= mask.to_numpy(dtype=bool).astype(np.int64) << bit
+  texts = {
+      code: ', '.join(reason for bit, reason in enumerate(FLAGGING_REASONS)
+                      if code >> bit & 1) or NO_FLAGGING_REASON
+      for code in np.unique(codes)
+  }
+  return pd.Series(codes, index=records.index).map(texts)
@@ -0,0 +1,481 @@
+import re
+import heapq
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# A designator is a device prefix followed by a number. The old
+# numbering has short numbers (W6, WOW18), the new one numbers with
+# NEW_SCHEME_DIGITS or more digits (W2006, WOW2018).
+NEW_SCHEME_DIGITS = 4
+OLD_SCHEME = 'old'
+NEW_SCHEME = 'new'
+
+# In the new numbering the last NEW_SCHEME_SEQUENCE_DIGITS digits are
+# the sequence on the floor and the digits before them the floor
+# (W2006 is the 6th workstation on floor 2)
+NEW_SCHEME_SEQUENCE_DIGITS = 3
+
+# Splits any text into leading letters, the digits after them and
+# whatever is left, so one regex match tells every format error apart
+DESIGNATOR_PARTS = re.compile(
+    r'^(?P<prefix>[A-Za-z]*)(?P<number>\d*)(?P<rest>.*)$', re.DOTALL)
+
+# Device class of a designator by prefix. Other prefixes belong to the
+# class of their first letter, as in the device counts.
+DEVICE_CLASSES = {
+    'WOW': 'WOWs',
+    'L': 'Laptops',
+    'W': 'Workstations',
+    'P': 'Printers',
+    'S': 'Specialty Printers',
+}
+CLASS_PREFIXES = {
+    device_class: prefix
+    for prefix, device_class in DEVICE_CLASSES.items()
+}
+
+# Prefixes a valid designator may have. Sites add their own (see
+# sites.SiteProfile.designator_prefixes).
+KNOWN_PREFIXES = frozenset(DEVICE_CLASSES)
+
+# Reason codes returned by validate_designators()
+DESIGNATOR_VALID = 'Valid'
+DESIGNATOR_BLANK = 'Blank'
+DESIGNATOR_REMOTE = 'Remote device'
+DESIGNATOR_NOT_TEXT = 'Not text'
+DESIGNATOR_NO_PREFIX = 'Missing device prefix'
+DESIGNATOR_UNKNOWN_PREFIX = 'Unknown device prefix'
+DESIGNATOR_NO_NUMBER = 'Missing number'
+DESIGNATOR_BAD_FORMAT = 'Unexpected characters'
+DESIGNATOR_WRONG_SCHEME = 'Numbering not used at site'
+
+# Letters typed for the digits they look like, in the number part of a
+# designator (W20O6 for W2006)
+DIGIT_LOOKALIKES = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+
+# Separators techs type inside designators (W 2006, W-2006)
+DESIGNATOR_SEPARATORS = re.compile(r'[\s._-]+')
+
+# Numbers further than this from the rest of a group's numbers are
+# taken for typos rather than part of its numbering (W2006 among W1-W40
+# is most likely a mistyped W26, not 1966 missing devices)
+MAX_SEQUENCE_JUMP = 50
+
+# Prefix suggested for a record whose own designator has no usable
+# prefix, by the start of its device Type
+TYPE_PREFIXES = {'workstation': 'W', 'desktop': 'W', 'laptop': 'L', 'printer': 'P'}
+
+# A parsed designator. prefix, number and device_class are filled in
+# as far as the text allows even when it isn't valid; floor is only
+# known in the new numbering, where sequence is the number on the
+# floor (the whole number in the old numbering).
+Designator = namedtuple('Designator', [
+    'text', 'prefix', 'device_class', 'number', 'floor', 'sequence',
+    'scheme', 'reason'
+])
+
+# Reasons that make a designator incorrect. Blank designators are
+# reported as missing data elsewhere, and devices EPIC lists as remote
+# don't need one.
+INCORRECT_DESIGNATOR_REASONS = [
+    DESIGNATOR_NOT_TEXT, DESIGNATOR_NO_PREFIX, DESIGNATOR_UNKNOWN_PREFIX,
+    DESIGNATOR_NO_NUMBER, DESIGNATOR_BAD_FORMAT, DESIGNATOR_WRONG_SCHEME
+]
+
+
+@lru_cache(maxsize=None)
+def parse_designator(text, site_prefixes=frozenset()):
+  """
+    Parse a designator. Results are memoized, so every distinct
+    designator is parsed once however often it is looked up.
+
+    Args:
+        text (str): The designator, already stripped.
+        site_prefixes (frozenset): Prefixes the site uses on top of
+            KNOWN_PREFIXES, upper-case.
+
+    Returns:
+        Designator
+  """
+  prefix, digits, rest = DESIGNATOR_PARTS.match(text).groups()
+  upper = prefix.upper()
+  device_class = DEVICE_CLASSES['WOW'] if upper.startswith(
+      'WOW') else DEVICE_CLASSES.get(upper[:1])
+  number = int(digits) if digits else None
+
+  floor = sequence = scheme = None
+  if not text:
+    reason = DESIGNATOR_BLANK
+  elif not prefix:
+    reason = DESIGNATOR_NO_PREFIX
+  elif not digits and not rest:
+    reason = DESIGNATOR_NO_NUMBER
+  elif rest or not digits:
+    reason = DESIGNATOR_BAD_FORMAT
+  elif upper not in KNOWN_PREFIXES and upper not in site_prefixes:
+    reason = DESIGNATOR_UNKNOWN_PREFIX
+  else:
+    reason = DESIGNATOR_VALID
+    if len(digits) >= NEW_SCHEME_DIGITS:
+      scheme = NEW_SCHEME
+      floor = int(digits[:-NEW_SCHEME_SEQUENCE_DIGITS])
+      sequence = int(digits[-NEW_SCHEME_SEQUENCE_DIGITS:])
+    else:
+      scheme = OLD_SCHEME
+      sequence = number
+  return Designator(text, prefix or None, device_class, number, floor,
+                    sequence, scheme, reason)
+
+
+def parse_designators(designators, site_prefixes=()):
+  """
+    Parse a column of designators, each distinct value once.
+
+    Args:
+        designators (Series): The 'Flr Pln D' column, already stripped.
+        site_prefixes (iterable): Prefixes the site uses on top of
+            KNOWN_PREFIXES.
+
+    Returns:
+        Series: A Designator per text value, missing for blanks and
+        non-text values, indexed like designators.
+  """
+  site_prefixes = frozenset(prefix.upper() for prefix in site_prefixes)
+  parsed = {
+      value: parse_designator(value, site_prefixes)
+      for value in pd.unique(designators.dropna())
+      if isinstance(value, str)
+  }
+  return designators.astype(object).map(parsed)
+
+
+def validate_designators(designators,
+                         epic_loc=None,
+                         schemes=None,
+                         site_prefixes=()):
+  """
+    Check the format of every designator, parsing each distinct
+    designator once.
+
+    Blanks, numbers and other non-text values are handled without
+    raising, so no row needs to be checked on its own.
+
+    Args:
+        designators (Series): The 'Flr Pln D' column, already stripped.
+        epic_loc (Series): The 'EPIC_LOC' column. Invalid designators of
+            devices whose EPIC_LOC mentions "remote" are exempt.
+        schemes (tuple): Numberings in use at the site (see
+            sites.SiteProfile), None accepts both.
+        site_prefixes (iterable): Prefixes the site uses on top of
+            KNOWN_PREFIXES.
+
+    Returns:
+        DataFrame: Indexed like designators, with a 'reason' column
+        (one of the DESIGNATOR_* codes) and a 'scheme' column
+        (OLD_SCHEME or NEW_SCHEME for valid designators, missing
+        otherwise).
+  """
+  parsed = parse_designators(designators, site_prefixes)
+  reasons = parsed.map(lambda designator: designator.reason,
+                       na_action='ignore')
+  # Blanks have no Designator, other values without one aren't text
+  reasons = reasons.where(
+      parsed.notna(),
+      np.where(designators.isna(), DESIGNATOR_BLANK, DESIGNATOR_NOT_TEXT))
+
+  schemes_found = parsed.map(lambda designator: designator.scheme,
+                             na_action='ignore')
+  if schemes is not None:
+    reasons = reasons.mask(
+        reasons.eq(DESIGNATOR_VALID) & ~schemes_found.isin(schemes),
+        DESIGNATOR_WRONG_SCHEME)
+
+  if epic_loc is not None:
+    remote = epic_loc.astype('string').str.contains(
+        'remote', case=False, regex=False).fillna(False).astype(bool)
+    exempt = remote & reasons.isin(INCORRECT_DESIGNATOR_REASONS)
+    reasons = reasons.mask(exempt, DESIGNATOR_REMOTE)
+
+  return pd.DataFrame({
+      'reason': reasons,
+      'scheme': schemes_found
+  },
+                      index=designators.index)
+
+
+def number_runs(numbers, weights=None):
+  """
+    Split numbers wherever they jump by more than MAX_SEQUENCE_JUMP, and
+    pick the run that is the group's actual numbering.
+
+    Args:
+        numbers (list): Sorted distinct numbers.
+        weights (dict): {number: designators using it}, 1 each by default.
+
+    Returns:
+        tuple: (runs, main run), each run a sorted list of numbers. The
+        main run is the one with the most designators, [] without numbers.
+  """
+  if not numbers:
+    return [], []
+  runs = [[numbers[0]]]
+  for previous, number in zip(numbers, numbers[1:]):
+    if number - previous > MAX_SEQUENCE_JUMP or number < 1:
+      runs.append([])
+    runs[-1].append(number)
+  main = max(runs,
+             key=lambda run: sum(
+                 weights[number] if weights else 1 for number in run))
+  return runs, main
+
+
+class DesignatorAllocator:
+  """
+    Hands out the unused numbers of one floor plan and prefix: first the
+    gaps of the group's main run of numbers (see number_runs), lowest
+    first, then the numbers after it. Numbers outside the main run, such
+    as a mistyped W30000000 among W1-W40, count as used but open no gaps.
+    The gaps are kept as (first, last) ranges, so memory grows with the
+    number of designators and each number costs O(log n).
+  """
+
+  def __init__(self, used):
+    self.used = set(used)
+    runs, main = number_runs(sorted(self.used))
+    # Sorted, so already a heap
+    self.free = [(previous + 1, number - 1)
+                 for previous, number in zip(main, main[1:])
+                 if number - previous > 1]
+    self.next_number = main[-1] + 1 if main else 1
+
+  def take(self):
+    if self.free:
+      first, last = heapq.heappop(self.free)
+      if first < last:
+        heapq.heappush(self.free, (first + 1, last))
+      number = first
+    else:
+      while self.next_number in self.used:
+        self.next_number += 1
+      number = self.next_number
+      self.next_number += 1
+    self.used.add(number)
+    return number
+
+
+def type_prefix(device_type):
+  # Designator prefix of a device Type, None if there is no usual one
+  device_type = str(device_type).strip().lower()
+  for type_name, prefix in TYPE_PREFIXES.items():
+    if device_type.startswith(type_name):
+      return prefix
+  return None
+
+
+def suggest_designators(df, site_prefixes=(), reasons=None):
+  """
+    Suggest a designator for every incorrect, missing or duplicated one.
+    Records without a floor plan have no numbering to take a number
+    from and get none, nor do records exempt as remote.
+
+    Records are grouped by ('Flr Pln L', 'Flr Pln N') and prefix. The
+    numbers in use per group are collected once, then a single pass
+    over the records hands each record that needs one the next free
+    number of its group. A designator is duplicated when an earlier
+    record of the same group already uses its number.
+
+    Args:
+        df (DataFrame): The ITAM export with 'Flr Pln D' stripped.
+        site_prefixes (iterable): Prefixes the site uses on top of
+            KNOWN_PREFIXES.
+        reasons (Series): validate_designators() reasons of the records,
+            if checked. Records marked DESIGNATOR_REMOTE are skipped.
+
+    Returns:
+        Series: The suggested designator, missing where none is needed,
+        the record has no floor plan or is remote, or its prefix can't
+        be told from its designator or Type.
+  """
+  parsed = parse_designators(df['Flr Pln D'], site_prefixes).tolist()
+  remote = ([False] * len(df) if reasons is None else
+            reasons.eq(DESIGNATOR_REMOTE).tolist())
+  old_plans = [None if pd.isna(value) else value for value in df['Flr Pln L']]
+  new_plans = [None if pd.isna(value) else value for value in df['Flr Pln N']]
+  device_types = df['Type'].tolist() if 'Type' in df else [None] * len(df)
+
+  keys = []
+  used = {}
+  for designator, old_plan, new_plan, device_type, exempt in zip(
+      parsed, old_plans, new_plans, device_types, remote):
+    parsed_text = isinstance(designator, Designator)
+    valid = parsed_text and designator.reason == DESIGNATOR_VALID
+    if valid:
+      prefix = designator.prefix.upper()
+    elif parsed_text and designator.device_class is not None:
+      prefix = CLASS_PREFIXES[designator.device_class]
+    else:
+      prefix = type_prefix(device_type)
+    if exempt or (old_plan is None and new_plan is None):
+      prefix = None
+    key = (old_plan, new_plan, prefix)
+    keys.append((key, designator.number if valid else None))
+    if valid:
+      used.setdefault(key, set()).add(designator.number)
+
+  allocators = {}
+  seen = {}
+  suggestions = []
+  for key, number in keys:
+    seen_numbers = seen.setdefault(key, set())
+    if number is not None and number not in seen_numbers:
+      seen_numbers.add(number)
+      suggestions.append(None)
+      continue
+    if key[2] is None:
+      suggestions.append(None)
+      continue
+    allocator = allocators.get(key)
+    if allocator is None:
+      allocator = allocators[key] = DesignatorAllocator(used.get(key, ()))
+    suggestions.append(f"{key[2]}{allocator.take()}")
+  return pd.Series(suggestions, index=df.index, dtype=object)
+
+
+def normalize_designator(text):
+  """
+    Normalize a designator for near-duplicate matching: separators are
+    dropped, letters upper-cased and look-alike letters in the number
+    turned into digits, so "w 20O6 " becomes "W2006".
+
+    Args:
+        text (str): The designator.
+
+    Returns:
+        str
+  """
+  compact = DESIGNATOR_SEPARATORS.sub('', text).upper()
+  digit = next(
+      (position for position, char in enumerate(compact) if char.isdigit()),
+      len(compact))
+  return compact[:digit] + compact[digit:].translate(DIGIT_LOOKALIKES)
+
+
+def edit_distance(first, second):
+  # Optimal string alignment distance: insertions, deletions,
+  # substitutions and swaps of neighbouring characters cost 1
+  previous2 = None
+  previous = list(range(len(second) + 1))
+  for i, first_char in enumerate(first, start=1):
+    current = [i] + [0] * len(second)
+    for j, second_char in enumerate(second, start=1):
+      current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                       previous[j - 1] + (first_char != second_char))
+      if (i > 1 and j > 1 and first_char == second[j - 2] and
+          first[i - 2] == second_char):
+        current[j] = min(current[j], previous2[j - 2] + 1)
+    previous2, previous = previous, current
+  return previous[-1]
+
+
+def deletion_keys(text):
+  # The text and every text one deletion away from it. Two texts within
+  # one edit (or one swap) of each other always share one of these.
+  return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def near_duplicate_pairs(texts, site_prefixes=()):
+  """
+    Find the near-duplicates among the distinct designators of a block.
+
+    Two designators are near-duplicates when they differ as typed but
+    normalize to the same text, or when their normalized texts are one
+    edit apart and either one of them isn't a valid designator (W2006
+    and W2006x) or they share their number and the first letter of
+    their prefix (W2006 and WW2006). W12 and W13, or P4 and L4, are one
+    edit apart as well, but name different devices, so they are not.
+
+    Candidates come from an index of deletion keys (see deletion_keys),
+    so only designators that can be one edit apart are ever compared.
+
+    Args:
+        texts (iterable): Distinct designators of one block, stripped.
+        site_prefixes (iterable): Prefixes the site uses on top of
+            KNOWN_PREFIXES.
+
+    Returns:
+        list: (designator, designator) pairs.
+  """
+  texts = sorted(set(texts))
+  site_prefixes = frozenset(prefix.upper() for prefix in site_prefixes)
+  normalized = [normalize_designator(text) for text in texts]
+  candidates = {}
+  for position, text in enumerate(normalized):
+    for key in deletion_keys(text):
+      candidates.setdefault(key, []).append(position)
+
+  # Positions are listed in increasing order, so first < second
+  pairs = set()
+  for positions in candidates.values():
+    for index, first in enumerate(positions):
+      for second in positions[index + 1:]:
+        pairs.add((first, second))
+
+  near = []
+  for first, second in sorted(pairs):
+    if normalized[first] != normalized[second]:
+      if edit_distance(normalized[first], normalized[second]) > 1:
+        continue
+      parsed = [
+          parse_designator(normalized[position], site_prefixes)
+          for position in (first, second)
+      ]
+      # Designators without a prefix (2006, #2006) name no device
+      same_device = (parsed[0].number == parsed[1].number and
+                     (parsed[0].prefix or '')[:1] ==
+                     (parsed[1].prefix or '')[:1])
+      if not same_device and all(designator.reason == DESIGNATOR_VALID
+                                 for designator in parsed):
+        continue
+    near.append((texts[first], texts[second]))
+  return near
+
+
+def near_duplicate_designators(df, block_column='Flr Pln N', site_prefixes=()):
+  """
+    Find designators that nearly duplicate another designator on the
+    same floor plan (see near_duplicate_pairs). Records are blocked by
+    floor plan, so designators are only compared within one floor plan;
+    records without a floor plan or designator aren't compared.
+
+    Args:
+        df (DataFrame): The ITAM export with 'Flr Pln D' stripped.
+        block_column (str): Column designators are blocked by.
+        site_prefixes (iterable): Prefixes the site uses on top of
+            KNOWN_PREFIXES.
+
+    Returns:
+        Series: The designators each record's designator nearly
+        duplicates, comma separated, missing where there are none.
+  """
+  designators = df['Flr Pln D'].astype(object)
+  blocks = df[block_column].astype(object)
+  typed = designators.map(lambda value: value.strip()
+                          if isinstance(value, str) else None)
+  keyed = typed.notna() & typed.ne('') & blocks.notna()
+
+  matches = {}
+  for block, texts in typed[keyed].groupby(blocks[keyed], sort=False):
+    for first, second in near_duplicate_pairs(texts.unique(), site_prefixes):
+      matches.setdefault((block, first), set()).add(second)
+      matches.setdefault((block, second), set()).add(first)
+
+  return pd.Series([
+      ', '.join(sorted(matches[(block, text)]))
+      if keep and (block, text) in matches else None
+      for block, text, keep in zip(blocks, typed, keyed)
+  ],
+                   index=df.index,
+                   dtype=object)
@@ -0,0 +1,304 @@
+import os
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+
+from Components.parse_cache import read_excel_cached
+
+
+def read_excel_file(input_file, skiprows=1, use_cache=True):
+  """
+    Read the first sheet of an ITAM export into a DataFrame.
+
+    Parses are cached by workbook content (see Components.parse_cache),
+    so re-running a script on the same export skips the Excel parse.
+
+    Args:
+        input_file (str): Path to the input Excel file.
+        skiprows (int): Rows above the header, 1 skips the title row.
+        use_cache (bool): Set to False to always parse the workbook.
+
+    Returns:
+        DataFrame: The sheet with the header row as column names.
+  """
+  if use_cache:
+    return read_excel_cached(input_file, skiprows=skiprows)
+  return pd.read_excel(input_file, skiprows=skiprows)
+
+
+class ColumnProjection:
+  """
+    Which columns of the sheet a RowStore keeps and where new columns
+    go. It is applied while the sheet is read, so rows come out in their
+    final layout and no columns are deleted or shifted afterwards.
+
+    Args:
+        keep (list): Sheet columns to keep, None keeps them all.
+        drop (list): Sheet columns to leave out.
+        insert (dict): New column name -> 1-based position in the final
+            layout. New columns start out empty.
+  """
+
+  def __init__(self, keep=None, drop=(), insert=None):
+    self.keep = None if keep is None else set(keep)
+    self.drop = set(drop)
+    self.insert = dict(insert or {})
+
+  def resolve(self, header):
+    """
+      Args:
+          header (tuple): Column names of the sheet.
+
+      Returns:
+          tuple: (final column names, sheet index of each final column,
+          None for the inserted ones)
+    """
+    layout = [(name, index) for index, name in enumerate(header)
+              if (self.keep is None or name in self.keep) and
+              name not in self.drop]
+    for name, position in sorted(self.insert.items(),
+                                 key=lambda item: item[1]):
+      layout.insert(position - 1, (name, None))
+    return [name for name, index in layout], [index for name, index in layout]
+
+  def in_place(self, header):
+    # True when every kept column stays at its sheet position, i.e. new
+    # columns only take the place of dropped ones, so the projected rows
+    # line up with the columns of the workbook itself
+    names, indexes = self.resolve(header)
+    return len(names) == len(header) and all(
+        index is None or index == position
+        for position, index in enumerate(indexes))
+
+
+class RowStore:
+  """
+    Compact, read-only copy of the first sheet of an ITAM export.
+
+    The sheet is read exactly once with a read-only, values-only pass,
+    so no openpyxl Cell objects are kept around, and in the layout of
+    an optional ColumnProjection. Rows are addressed by
+    their sheet row number (data starts right below the header row) so
+    issue messages keep pointing at the rows techs see in Excel.
+  """
+
+  def __init__(self,
+               header,
+               rows,
+               header_row=2,
+               leading_rows=(),
+               sheet_title=None,
+               source_header=None):
+    self.header = list(header)
+    # Column names as found on the sheet, before any projection
+    self.source_header = list(header if source_header is None else
+                              source_header)
+    self.rows = rows
+    self.header_row = header_row
+    # Rows above the header (the report title) and the sheet name,
+    # kept so the sheet can be written back out
+    self.leading_rows = list(leading_rows)
+    self.sheet_title = sheet_title
+    self.first_row = header_row + 1
+    self.max_row = header_row + len(rows)
+    self.column_index_map = {
+        name: index + 1
+        for index, name in enumerate(self.header)
+    }
+
+  @classmethod
+  def from_workbook(cls, input_file, header_row=2, projection=None):
+    """
+      Stream the active sheet of input_file into a RowStore.
+
+      Args:
+          input_file (str): Path to the input Excel file.
+          header_row (int): Sheet row holding the column names.
+          projection (ColumnProjection): Layout of the stored rows,
+              defaults to the sheet's own.
+
+      Returns:
+          RowStore
+    """
+    wb = load_workbook(input_file, read_only=True, data_only=False)
+    try:
+      sheet_title = wb.active.title
+      source_header = header = ()
+      indexes = None
+      leading_rows = []
+      rows = []
+      for row_number, values in enumerate(wb.active.iter_rows(values_only=True),
+                                          start=1):
+        if row_number == header_row:
+          source_header = header = values
+          if projection is not None:
+            header, indexes = projection.resolve(source_header)
+        elif row_number > header_row:
+          # Short rows are padded so every row lines up with the header
+          if len(values) < len(source_header):
+            values += (None, ) * (len(source_header) - len(values))
+          if indexes is not None:
+            values = tuple(None if index is None else values[index]
+                           for index in indexes)
+          rows.append(values)
+        else:
+          leading_rows.append(values)
+    finally:
+      # Read-only workbooks keep the file handle open until closed
+      wb.close()
+
+    return cls(header, rows, header_row, leading_rows, sheet_title,
+               source_header)
+
+  def row_numbers(self):
+    # Sheet row numbers of every data row
+    return range(self.first_row, self.max_row + 1)
+
+  def row(self, row):
+    return self.rows[row - self.first_row]
+
+  def value(self, row, name):
+    return self.rows[row - self.first_row][self.column_index_map[name] - 1]
+
+  def column(self, name):
+    index = self.column_index_map[name] - 1
+    return [values[index] for values in self.rows]
+
+  def to_frame(self, columns=None):
+    # Column-wise view of the rows, indexed by sheet row number,
+    # limited to the given columns
+    if columns is None:
+      return pd.DataFrame(self.rows,
+                          columns=self.header,
+                          index=self.row_numbers(),
+                          dtype=object)
+    indexes = [self.column_index_map[name] - 1 for name in columns]
+    return pd.DataFrame([[values[index] for index in indexes]
+                         for values in self.rows],
+                        columns=columns,
+                        index=self.row_numbers(),
+                        dtype=object)
+
+
+def unique_output_file(output_folder, output_file_name):
+  """
+    Pick output_file_name, or the next free "_copyN" name, in output_folder.
+
+    The folder is listed once instead of probing each candidate name,
+    and the chosen name is reserved with an empty placeholder so
+    parallel runs saving in the same second never share a file. Callers
+    remove the placeholder if writing the output fails.
+
+    Args:
+        output_folder (str): Folder the output goes to.
+        output_file_name (str): Preferred file name.
+
+    Returns:
+        str: Path of the reserved file name.
+  """
+  os.makedirs(output_folder, exist_ok=True)
+  existing = set(os.listdir(output_folder))
+  stem, extension = os.path.splitext(output_file_name)
+  candidate = output_file_name
+  copy_number = 1
+  while True:
+    if candidate not in existing:
+      try:
+        os.close(
+            os.open(os.path.join(output_folder, candidate),
+                    os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+        return os.path.join(output_folder, candidate)
+      except FileExistsError:
+        pass
+    candidate = f"{stem}_copy{copy_number}{extension}"
+    copy_number += 1
+
+
+def stream_workbook(output_file,
+                    rows,
+                    fill_cache,
+                    row_colors=None,
+                    cell_colors=None,
+                    override_colors=None,
+                    sheet_title=None):
+  """
+    Write rows to output_file through a write-only workbook.
+
+    Each row is turned into cells, written and dropped as it comes, so
+    memory stays flat however large the sheet is. Only values and fills
+    are written; column widths and other styling of the input are not
+    carried over.
+
+    Args:
+        output_file (str): Path of the workbook to write.
+        rows (iterable): (sheet row number, values) tuples, in order.
+        fill_cache (FillCache): Source of the shared fills.
+        row_colors (dict): Sheet row number -> colour of the whole row.
+        cell_colors (dict): (sheet row number, column) -> colour of one
+            cell, used where the row has no colour of its own.
+        override_colors (dict): (sheet row number, column) -> colour of
+            one cell, used over the colour of the row.
+        sheet_title (str): Name of the sheet.
+
+    Returns:
+        int: Number of rows written.
+  """
+  row_colors = row_colors or {}
+  colors_by_row = {}
+  overrides_by_row = {}
+  for (row, column), color in (cell_colors or {}).items():
+    colors_by_row.setdefault(row, {})[column] = color
+  for (row, column), color in (override_colors or {}).items():
+    overrides_by_row.setdefault(row, {})[column] = color
+
+  wb = Workbook(write_only=True)
+  ws = wb.create_sheet(sheet_title)
+  written = 0
+  for row, values in rows:
+    row_color = row_colors.get(row)
+    cell_color = colors_by_row.get(row, {})
+    override = overrides_by_row.get(row, {})
+    if row_color is None and not cell_color and not override:
+      ws.append(values)
+    else:
+      cells = []
+      for column, value in enumerate(values, start=1):
+        cell = WriteOnlyCell(ws, value=value)
+        color = override.get(column) or row_color or cell_color.get(column)
+        if color:
+          cell.fill = fill_cache.get(color)
+          fill_cache.cells_filled += 1
+        cells.append(cell)
+      ws.append(cells)
+    written += 1
+
+  save_workbook_atomic(wb, output_file)
+  return written
+
+
+def save_workbook_atomic(wb, output_file):
+  """
+    Save a workbook to a temporary file and rename it into place, so
+    output_file is either missing or complete, never half written.
+
+    Args:
+        wb (Workbook): The workbook to save.
+        output_file (str): Final path of the workbook.
+  """
+  output_folder = os.path.dirname(output_file) or "."
+  os.makedirs(output_folder, exist_ok=True)
+  handle, temp_file = tempfile.mkstemp(dir=output_folder, suffix=".tmp")
+  os.close(handle)
+  try:
+    wb.save(temp_file)
+    # mkstemp makes the file private, give it the mode a plain save would
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(temp_file, 0o666 & ~umask)
+    os.replace(temp_file, output_file)
+  except BaseException:
+    if os.path.exists(temp_file):
+      os.remove(temp_file)
+    raise
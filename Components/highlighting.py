@@ -0,0 +1,136 @@
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+# Row colour by number of issues: yellow, orange, and red for three or more
+SEVERITY_COLORS = {1: "FFFF00", 2: "FF8000", 3: "FF0000"}
+# Designator cell of a row repeating an earlier row of its duplicate
+# cluster, painted over the row colour
+DUPLICATE_COLOR = "FF0000"
+
+
+def row_ranges(rows):
+  """
+    Collapse row numbers into (first, last) ranges of consecutive rows.
+
+    Args:
+        rows (iterable): Sheet row numbers.
+
+    Returns:
+        list: (first row, last row) tuples in ascending order.
+  """
+  ranges = []
+  for row in sorted(set(rows)):
+    if ranges and ranges[-1][1] == row - 1:
+      ranges[-1] = (ranges[-1][0], row)
+    else:
+      ranges.append((row, row))
+  return ranges
+
+
+class FillCache:
+  """
+    Hands out one shared PatternFill per colour and applies it to
+    whole row ranges, so highlighting a sheet creates a handful of
+    style objects no matter how many cells are painted.
+  """
+
+  def __init__(self):
+    self.fills = {}
+    self.created = 0
+    self.cells_filled = 0
+
+  def get(self, color):
+    # Colours are stored as plain RGB hex, e.g. "FFFF00"
+    color = color.lstrip("#").upper()
+    fill = self.fills.get(color)
+    if fill is None:
+      fill = self.fills[color] = PatternFill(start_color=color,
+                                             end_color=color,
+                                             fill_type="solid")
+      self.created += 1
+    return fill
+
+  def fill_cell(self, ws, row, column, color):
+    ws.cell(row=row, column=column).fill = self.get(color)
+    self.cells_filled += 1
+
+  def fill_rows(self, ws, rows, color, min_col=1, max_col=None):
+    """
+      Fill every cell between min_col and max_col on the given rows.
+
+      Args:
+          ws (Worksheet): The sheet to paint.
+          rows (iterable): Sheet row numbers to fill.
+          color (str): RGB hex colour.
+          min_col (int): First column to fill.
+          max_col (int): Last column to fill, defaults to ws.max_column.
+    """
+    fill = self.get(color)
+    max_col = max_col or ws.max_column
+    for first, last in row_ranges(rows):
+      for cells in ws.iter_rows(min_row=first,
+                                max_row=last,
+                                min_col=min_col,
+                                max_col=max_col):
+        for cell in cells:
+          cell.fill = fill
+      self.cells_filled += (last - first + 1) * (max_col - min_col + 1)
+
+  def report(self):
+    return (f"Highlighting created {self.created} fill style(s) "
+            f"for {self.cells_filled} cell(s)")
+
+
+def add_severity_rules(ws,
+                       severity_column,
+                       first_row,
+                       last_row,
+                       fill_cache,
+                       cluster_column=None,
+                       designator_column=None):
+  """
+    Highlight rows with conditional formatting instead of painted cells.
+
+    The rules key off a severity helper column holding the number of
+    issues of each row, so the saved file carries a handful of rules
+    rather than a style record for every highlighted cell. With a
+    cluster helper column, the designator cell of every row repeating
+    its duplicate cluster is red whatever the colour of the row.
+
+    Args:
+        ws (Worksheet): The sheet to format.
+        severity_column (int): Column holding the issue count per row.
+        first_row (int): First data row.
+        last_row (int): Last data row.
+        fill_cache (FillCache): Source of the shared fills.
+        cluster_column (int): Column holding the duplicate cluster of
+            the rows repeating an earlier row of their cluster, blank
+            on the others.
+        designator_column (int): Column of the designator cell painted
+            on those rows.
+
+    Returns:
+        int: Number of rules written.
+  """
+  cells = f"A{first_row}:{get_column_letter(ws.max_column)}{last_row}"
+  severity = f"${get_column_letter(severity_column)}{first_row}"
+  rules = []
+  if cluster_column is not None:
+    # Added first so it takes priority over the row rules on that cell
+    designators = get_column_letter(designator_column)
+    cluster = f"${get_column_letter(cluster_column)}{first_row}"
+    rules.append((f"{designators}{first_row}:{designators}{last_row}",
+                  f"{cluster}>0", DUPLICATE_COLOR))
+  rules += [(cells, formula, color) for formula, color in (
+      (f"{severity}>=3", SEVERITY_COLORS[3]),
+      (f"{severity}=2", SEVERITY_COLORS[2]),
+      (f"{severity}=1", SEVERITY_COLORS[1]),
+  )]
+  for cell_range, formula, color in rules:
+    ws.conditional_formatting.add(
+        cell_range,
+        FormulaRule(formula=[formula],
+                    fill=fill_cache.get(color),
+                    stopIfTrue=True))
+  return len(rules)
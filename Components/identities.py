@@ -0,0 +1,98 @@
+import pandas as pd
+
+# Columns identifying a device on its own, wherever it is installed
+IDENTITY_COLUMNS = ['Serial', 'Hostname', 'Tag']
+
+# Values techs enter when an identifier is unknown. They are treated
+# as blanks, so they never make two devices duplicates.
+PLACEHOLDER_IDENTIFIERS = {
+    'N/A', 'NA', 'NONE', 'NULL', 'UNKNOWN', 'TBD', 'NOT FOUND', '-', '0'
+}
+
+# Bit set in the 'Identity Rules' column and reason, per identity
+# column whose values must be unique
+IDENTITY_DUPLICATE_RULES = {
+    'Serial': (1, 'Duplicate Serial'),
+    'Hostname': (2, 'Duplicate Hostname'),
+    'Tag': (4, 'Duplicate Tag'),
+}
+
+# Bit and reason per (key, other) pair where every record sharing a key
+# value must have the same other value, e.g. one serial showing up
+# under two hostnames
+IDENTITY_CONFLICT_RULES = {
+    ('Serial', 'Hostname'): (8, 'Serial with different Hostnames'),
+    ('Serial', 'Tag'): (16, 'Serial with different Tags'),
+    ('Hostname', 'Serial'): (32, 'Hostname with different Serials'),
+}
+
+# Bit and reason for records whose identifiers another site's export
+# also lists, see Components.identity_index
+IDENTITY_OTHER_SITE_RULE = (64, 'Identifier used at another site')
+
+
+def normalize_identifiers(values):
+  """
+    Compare identifiers regardless of case and surrounding whitespace.
+
+    Args:
+        values (Series): A column of identifiers.
+
+    Returns:
+        Series: The values stripped and upper-cased as strings, missing
+        where the value is blank or a placeholder.
+  """
+  normalized = values.astype('string').str.strip().str.upper()
+  return normalized.mask(normalized.eq('')
+                         | normalized.isin(PLACEHOLDER_IDENTIFIERS))
+
+
+def normalized_identities(df, columns=IDENTITY_COLUMNS):
+  # The normalized identity columns df has
+  return pd.DataFrame(
+      {
+          column: normalize_identifiers(df[column])
+          for column in columns if column in df
+      },
+      index=df.index)
+
+
+def identity_rules(df,
+                   duplicate_rules=IDENTITY_DUPLICATE_RULES,
+                   conflict_rules=IDENTITY_CONFLICT_RULES):
+  """
+    Check that Serial, Hostname and Tag identify one device each.
+
+    Every column is normalized once and checked with one hashed
+    duplicated() / groupby pass, so the cost grows linearly with the
+    number of devices. Rules on columns missing from df are skipped.
+
+    Args:
+        df (DataFrame): The ITAM export.
+        duplicate_rules (dict): See IDENTITY_DUPLICATE_RULES.
+        conflict_rules (dict): See IDENTITY_CONFLICT_RULES.
+
+    Returns:
+        Series: Bitmask of the rules each record breaks, 0 if none.
+  """
+  columns = set(duplicate_rules).union(*conflict_rules)
+  identities = normalized_identities(df, sorted(columns))
+  rules = pd.Series(0, index=df.index, dtype='int64')
+  for column, (bit, reason) in duplicate_rules.items():
+    if column in identities:
+      values = identities[column]
+      rules[values.notna() & values.duplicated(keep=False)] |= bit
+  for (key, other), (bit, reason) in conflict_rules.items():
+    if key in identities and other in identities:
+      # Records with a blank key get no group and a missing count
+      spread = identities.groupby(key)[other].transform('nunique')
+      rules[spread.gt(1).fillna(False).astype(bool)] |= bit
+  return rules
+
+
+def identity_reasons(duplicate_rules=IDENTITY_DUPLICATE_RULES,
+                     conflict_rules=IDENTITY_CONFLICT_RULES):
+  # (bit, reason) of every identity rule, in bit order
+  return sorted(
+      list(duplicate_rules.values()) + list(conflict_rules.values()) +
+      [IDENTITY_OTHER_SITE_RULE])
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from Components.identities import IDENTITY_COLUMNS, normalized_identities
+
+IDENTITY_INDEX_FILE = os.path.join('Outputs', 'index', 'identities.sqlite')
+
+# identities holds the normalized Serial, Hostname and Tag of every
+# record of the latest export of each site, snapshots the date of that
+# export. The primary key doubles as the (kind, value) lookup index.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+  kind TEXT NOT NULL,
+  value TEXT NOT NULL,
+  site TEXT NOT NULL,
+  record_id TEXT NOT NULL,
+  PRIMARY KEY (kind, value, site, record_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS identities_by_site ON identities (site);
+CREATE TABLE IF NOT EXISTS snapshots (
+  site TEXT PRIMARY KEY,
+  snapshot TEXT NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS current_entries (
+  position INTEGER NOT NULL,
+  kind TEXT NOT NULL,
+  value TEXT NOT NULL,
+  record_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS temp.current_entries_by_key
+  ON current_entries (kind, value, record_id);
+"""
+
+
+def identity_entries(df, id_column='ID', columns=IDENTITY_COLUMNS):
+  """
+    List every non-blank identifier of an export.
+
+    Args:
+        df (DataFrame): The ITAM export.
+        id_column (str): Column holding the record ID. Records without
+            one are keyed by their row position.
+        columns (list): Identity columns to list.
+
+    Returns:
+        DataFrame: 'position' (row position in df), 'kind' (the column),
+        'value' (see identities.normalize_identifiers) and 'record_id'.
+  """
+  identities = normalized_identities(df, columns)
+  positions = pd.Series(range(len(df)), index=df.index)
+  record_ids = pd.Series([f"row {position}" for position in positions],
+                         index=df.index,
+                         dtype=object)
+  if id_column in df:
+    ids = df[id_column].astype('string')
+    record_ids = ids.astype(object).where(ids.notna(), record_ids)
+  entries = [
+      pd.DataFrame({
+          'position': positions[values.index].values,
+          'kind': kind,
+          'value': values.astype(object).values,
+          'record_id': record_ids[values.index].values
+      }) for kind, values in
+      ((kind, identities[kind].dropna()) for kind in identities)
+  ]
+  if not entries:
+    return pd.DataFrame(columns=['position', 'kind', 'value', 'record_id'])
+  return pd.concat(entries, ignore_index=True)
+
+
+class IdentityIndex:
+  """
+    Serial, Hostname and Tag of every site's latest export, kept in an
+    SQLite file so one site's run finds the devices another site lists
+    without opening that site's workbook.
+
+    Use as a context manager, or call close() when done.
+  """
+
+  def __init__(self, path=IDENTITY_INDEX_FILE):
+    self.path = path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    self.connection = sqlite3.connect(path)
+    self.connection.executescript(SCHEMA)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def close(self):
+    self.connection.close()
+
+  def load_entries(self, entries):
+    # Stage an export's identifiers for update() and collisions()
+    with self.connection:
+      self.connection.execute("DELETE FROM current_entries")
+      self.connection.executemany(
+          "INSERT INTO current_entries VALUES (?, ?, ?, ?)",
+          entries[['position', 'kind', 'value',
+                   'record_id']].itertuples(index=False, name=None))
+
+  def update(self, site, snapshot):
+    """
+      Make the staged identifiers the site's. Only identifiers that were
+      added or removed since the site's last export are written.
+
+      Args:
+          site (str): The site, see incremental.site_name.
+          snapshot (str): Date of the export, YYYY-MM-DD.
+
+      Returns:
+          bool: False if the index already holds a newer export of the
+          site, which is then left as it is.
+    """
+    row = self.connection.execute(
+        "SELECT snapshot FROM snapshots WHERE site = ?", (site, )).fetchone()
+    if row is not None and row[0] > snapshot:
+      return False
+    with self.connection:
+      self.connection.execute(
+          """
+          DELETE FROM identities
+          WHERE site = ? AND NOT EXISTS (
+            SELECT 1 FROM current_entries c
+            WHERE c.kind = identities.kind AND c.value = identities.value
+              AND c.record_id = identities.record_id)
+          """, (site, ))
+      self.connection.execute(
+          """
+          INSERT OR IGNORE INTO identities (kind, value, site, record_id)
+          SELECT DISTINCT kind, value, ?, record_id FROM current_entries
+          """, (site, ))
+      self.connection.execute(
+          """
+          INSERT INTO snapshots (site, snapshot) VALUES (?, ?)
+          ON CONFLICT (site) DO UPDATE SET snapshot = excluded.snapshot
+          """, (site, snapshot))
+    return True
+
+  def collisions(self, site):
+    """
+      Look every staged identifier up in the other sites, in one query.
+
+      Args:
+          site (str): The site of the staged export, left out of the search.
+
+      Returns:
+          DataFrame: One row per match with the 'position' and 'kind' /
+          'value' of the staged identifier and the 'site', 'record_id'
+          and 'snapshot' of the record listing it elsewhere.
+    """
+    return pd.read_sql_query(
+        """
+        SELECT c.position, c.kind, c.value, i.site, i.record_id, s.snapshot
+        FROM current_entries c
+        JOIN identities i ON i.kind = c.kind AND i.value = c.value
+        JOIN snapshots s ON s.site = i.site
+        WHERE i.site <> ?
+        ORDER BY c.position, i.site, i.record_id
+        """,
+        self.connection,
+        params=(site, ))
+
+  def check(self, df, site, snapshot, id_column='ID'):
+    """
+      Record an export in the index and find its identifiers at other sites.
+
+      Args:
+          df (DataFrame): The ITAM export.
+          site (str): The site, see incremental.site_name.
+          snapshot (str): Date of the export, YYYY-MM-DD.
+          id_column (str): Column holding the record ID.
+
+      Returns:
+          Series: Indexed like df, listing the other sites' records
+          sharing an identifier with the record, missing where none does.
+    """
+    self.load_entries(identity_entries(df, id_column))
+    self.update(site, snapshot)
+    found = self.collisions(site)
+    notes = [None] * len(df)
+    for position, matches in found.groupby('position', sort=False):
+      notes[position] = '; '.join(
+          f"{kind} {value} at {other_site} (ID {record_id}, {other_snapshot})"
+          for kind, value, other_site, record_id, other_snapshot in
+          matches[['kind', 'value', 'site', 'record_id',
+                   'snapshot']].itertuples(index=False, name=None))
+    return pd.Series(notes, index=df.index, dtype=object)
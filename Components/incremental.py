@@ -0,0 +1,134 @@
+import os
+import re
+import pickle
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+
+SNAPSHOT_FOLDER = os.path.join('Outputs', 'snapshots')
+
+# Date formats found at the end of export names ("PBMC EOD 12.19.23",
+# "LIJ 2_2_24")
+SNAPSHOT_DATE_FORMATS = [
+    '%m.%d.%y', '%m_%d_%y', '%m-%d-%y', '%m.%d.%Y', '%m_%d_%Y', '%m-%d-%Y',
+    '%Y-%m-%d', '%Y%m%d'
+]
+
+# IDs of the rows that changed, were added, were removed or are
+# identical between the stored snapshot and the new export
+SnapshotDiff = namedtuple('SnapshotDiff',
+                          ['changed', 'added', 'removed', 'unchanged'])
+
+
+def site_name(input_file):
+  """
+    Name a site's snapshots after its export, minus the trailing date,
+    so "PBMC EOD 12.19.23.xlsx" and "PBMC EOD 12.20.23.xlsx" share one.
+
+    Args:
+        input_file (str): Path to the export.
+
+    Returns:
+        str: The export name without its date.
+  """
+  stem = os.path.splitext(os.path.basename(input_file))[0]
+  return re.sub(r'[\s\d._-]+$', '', stem) or stem
+
+
+def snapshot_date(input_file):
+  """
+    Date of an export, from the end of its name or else the day the file
+    was last modified.
+
+    Args:
+        input_file (str): Path to the export.
+
+    Returns:
+        str: The date as YYYY-MM-DD.
+  """
+  stem = os.path.splitext(os.path.basename(input_file))[0]
+  suffix = stem[len(site_name(input_file)):].strip(' ._-')
+  for date_format in SNAPSHOT_DATE_FORMATS:
+    try:
+      return datetime.strptime(suffix, date_format).date().isoformat()
+    except ValueError:
+      pass
+  return datetime.fromtimestamp(os.path.getmtime(input_file)).date().isoformat()
+
+
+def row_hashes(frame):
+  # One 64-bit hash of every row's values, in frame order
+  return pd.util.hash_pandas_object(frame, index=False)
+
+
+def diff_snapshot(previous_hashes, current_hashes):
+  """
+    Compare the row hashes of two snapshots.
+
+    Args:
+        previous_hashes (Series): Row hashes of the stored snapshot by ID.
+        current_hashes (Series): Row hashes of the new export by ID.
+
+    Returns:
+        SnapshotDiff
+  """
+  shared = current_hashes.index.intersection(previous_hashes.index)
+  same = current_hashes[shared].values == previous_hashes[shared].values
+  return SnapshotDiff(
+      changed=shared[~same],
+      added=current_hashes.index.difference(previous_hashes.index),
+      removed=previous_hashes.index.difference(current_hashes.index),
+      unchanged=shared[same])
+
+
+class ResultStore:
+  """
+    Per-row results of the last processed export of a site, keyed by ID.
+
+    The results are saved together with a signature (the sheet header
+    and the rule set), and are only handed back while it still matches,
+    so a new column layout or a rule change forces a full run.
+  """
+
+  def __init__(self, path):
+    self.path = path
+
+  @classmethod
+  def for_input(cls, input_file, folder=SNAPSHOT_FOLDER):
+    return cls(os.path.join(folder, f"{site_name(input_file)}.pkl"))
+
+  def load(self, signature):
+    """
+      Args:
+          signature (tuple): Signature the results must have been saved with.
+
+      Returns:
+          DataFrame or None: The stored results by ID, None if there are
+          none or they were produced by a different layout or rule set.
+    """
+    if not os.path.exists(self.path):
+      return None
+    try:
+      with open(self.path, 'rb') as f:
+        stored = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+      return None
+    if stored.get('signature') != signature:
+      return None
+    return stored['results']
+
+  def save(self, results, signature):
+    # Written to a temporary file and renamed, like the output workbook
+    folder = os.path.dirname(self.path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    handle, temp_file = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+      with os.fdopen(handle, 'wb') as f:
+        pickle.dump({'signature': signature, 'results': results}, f)
+      os.replace(temp_file, self.path)
+    except BaseException:
+      if os.path.exists(temp_file):
+        os.remove(temp_file)
+      raise
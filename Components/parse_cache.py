@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import glob
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+  import pyarrow  # Parquet engine, the cache is skipped without it
+except ImportError:
+  pyarrow = None
+
+DEFAULT_CACHE_DIR = os.path.join('Outputs', 'cache')
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 * 1024  # 512 MB
+INDEX_FILE = 'index.json'
+
+# Excel columns can mix text and numbers, which Parquet can't store in
+# one column. Those columns are saved as text plus a type column holding
+# the code of each value's original type.
+TYPE_COLUMN_PREFIX = '__type__:'
+MIXED_TYPES = {0: str, 1: int, 2: float, 3: bool, 4: datetime}
+
+
+def load_index(cache_dir):
+  index_file = os.path.join(cache_dir, INDEX_FILE)
+  if not os.path.exists(index_file):
+    return {}
+  try:
+    with open(index_file) as f:
+      return json.load(f)
+  except (OSError, ValueError):
+    # A damaged index only costs a re-hash
+    return {}
+
+
+def save_index(cache_dir, index):
+  os.makedirs(cache_dir, exist_ok=True)
+  handle, temp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+  with os.fdopen(handle, 'w') as f:
+    json.dump(index, f, indent=2)
+  os.replace(temp_file, os.path.join(cache_dir, INDEX_FILE))
+
+
+def fingerprint(input_file, cache_dir=DEFAULT_CACHE_DIR):
+  """
+    Content hash of a workbook.
+
+    The hash is remembered with the file's size and mtime, so an
+    unchanged workbook is only read once to be hashed.
+
+    Args:
+        input_file (str): Path to the workbook.
+        cache_dir (str): Cache folder holding the index.
+
+    Returns:
+        str: SHA-256 of the workbook contents.
+  """
+  stat = os.stat(input_file)
+  index = load_index(cache_dir)
+  key = os.path.abspath(input_file)
+  entry = index.get(key)
+  if entry and entry['size'] == stat.st_size and entry[
+      'mtime_ns'] == stat.st_mtime_ns:
+    return entry['sha256']
+
+  sha256 = hashlib.sha256()
+  with open(input_file, 'rb') as f:
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+      sha256.update(chunk)
+  index[key] = {
+      'size': stat.st_size,
+      'mtime_ns': stat.st_mtime_ns,
+      'sha256': sha256.hexdigest(),
+  }
+  save_index(cache_dir, index)
+  return index[key]['sha256']
+
+
+def type_code(value):
+  # bool before int, bool is a subclass of int
+  for code, value_type in sorted(MIXED_TYPES.items(), key=lambda item: -item[0]):
+    if isinstance(value, value_type):
+      return code
+  return None
+
+
+def encode_frame(df):
+  """
+    Make a frame storable as Parquet by splitting mixed-type columns
+    into text and type code columns.
+
+    Returns:
+        DataFrame or None: None when a column holds a type the cache
+        can't restore.
+  """
+  encoded = {}
+  for column in df.columns:
+    values = df[column]
+    if values.dtype != object or values.dropna().map(type).nunique() <= 1:
+      encoded[column] = values
+      continue
+    codes = np.full(len(values), -1, dtype=np.int8)
+    text = np.full(len(values), None, dtype=object)
+    for position, value in enumerate(values):
+      if pd.isna(value):
+        continue
+      code = type_code(value)
+      if code is None:
+        return None
+      codes[position] = code
+      text[position] = value.isoformat() if code == 4 else repr(
+          value) if code == 2 else str(value)
+    encoded[column] = pd.Series(text, index=df.index, dtype=object)
+    encoded[TYPE_COLUMN_PREFIX + str(column)] = codes
+  return pd.DataFrame(encoded, index=df.index)
+
+
+def decode_frame(df):
+  # Restore the mixed-type columns written by encode_frame()
+  for type_column in [
+      column for column in df.columns
+      if str(column).startswith(TYPE_COLUMN_PREFIX)
+  ]:
+    column = type_column[len(TYPE_COLUMN_PREFIX):]
+    values = np.full(len(df), np.nan, dtype=object)
+    for position, (text, code) in enumerate(zip(df[column],
+                                                 df[type_column])):
+      if code == 4:
+        values[position] = datetime.fromisoformat(text)
+      elif code == 3:
+        values[position] = text == 'True'
+      elif code >= 0:
+        values[position] = MIXED_TYPES[code](text)
+    df[column] = pd.Series(values, index=df.index, dtype=object)
+    df = df.drop(columns=[type_column])
+  return df
+
+
+def evict(cache_dir=DEFAULT_CACHE_DIR, max_cache_bytes=DEFAULT_MAX_CACHE_BYTES):
+  """
+    Remove the least recently used cached frames until the cache fits
+    in max_cache_bytes.
+
+    Returns:
+        list: Removed cache files.
+  """
+  cached = sorted(glob.glob(os.path.join(cache_dir, '*.parquet')),
+                  key=os.path.getmtime)
+  total = sum(os.path.getsize(path) for path in cached)
+  removed = []
+  while cached and total > max_cache_bytes:
+    path = cached.pop(0)
+    total -= os.path.getsize(path)
+    os.remove(path)
+    removed.append(path)
+  return removed
+
+
+def read_excel_cached(input_file,
+                      skiprows=1,
+                      cache_dir=DEFAULT_CACHE_DIR,
+                      max_cache_bytes=DEFAULT_MAX_CACHE_BYTES):
+  """
+    pd.read_excel with an on-disk Parquet cache keyed by the workbook's
+    content hash, so re-running against the same export skips parsing.
+
+    Args:
+        input_file (str): Path to the input Excel file.
+        skiprows (int): Rows above the header, passed to pd.read_excel.
+        cache_dir (str): Cache folder.
+        max_cache_bytes (int): Size the cache is trimmed to after a write.
+
+    Returns:
+        DataFrame: The parsed sheet.
+  """
+  if pyarrow is None:
+    return pd.read_excel(input_file, skiprows=skiprows)
+
+  cache_file = os.path.join(
+      cache_dir, f"{fingerprint(input_file, cache_dir)}_skip{skiprows}.parquet")
+  if os.path.exists(cache_file):
+    # Touch the entry so eviction sees it as recently used
+    os.utime(cache_file)
+    print(f'Using cached parse of "{input_file}"')
+    return decode_frame(pd.read_parquet(cache_file))
+
+  df = pd.read_excel(input_file, skiprows=skiprows)
+  encoded = encode_frame(df)
+  if encoded is None:
+    print(f'"{input_file}" holds values the parse cache can\'t store, '
+          'it was not cached')
+    return df
+
+  os.makedirs(cache_dir, exist_ok=True)
+  handle, temp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+  os.close(handle)
+  try:
+    encoded.to_parquet(temp_file)
+    os.replace(temp_file, cache_file)
+  finally:
+    if os.path.exists(temp_file):
+      os.remove(temp_file)
+  evict(cache_dir, max_cache_bytes)
+  return df
+
+
+def invalidate(input_file=None, cache_dir=DEFAULT_CACHE_DIR):
+  """
+    Drop the cached parses of one workbook, or the whole cache.
+
+    Args:
+        input_file (str): Workbook to invalidate, None for everything.
+        cache_dir (str): Cache folder.
+
+    Returns:
+        int: Number of cached frames removed.
+  """
+  index = load_index(cache_dir)
+  if input_file is None:
+    pattern = '*.parquet'
+    index = {}
+  else:
+    key = os.path.abspath(input_file)
+    entry = index.pop(key, None)
+    if entry is not None:
+      sha256 = entry['sha256']
+    elif os.path.exists(input_file):
+      sha256 = fingerprint(input_file, cache_dir)
+      index.pop(key, None)
+    else:
+      return 0
+    pattern = f'{sha256}_*.parquet'
+
+  removed = glob.glob(os.path.join(cache_dir, pattern))
+  for path in removed:
+    os.remove(path)
+  if os.path.isdir(cache_dir):
+    save_index(cache_dir, index)
+  return len(removed)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Manage the parsed workbook cache.")
+  parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+  commands = parser.add_subparsers(dest='command', required=True)
+  invalidate_command = commands.add_parser(
+      'invalidate', help="Drop the cached parse of one workbook")
+  invalidate_command.add_argument('input_file')
+  commands.add_parser('clear', help="Drop every cached parse")
+  evict_command = commands.add_parser(
+      'evict', help="Trim the cache to a maximum size")
+  evict_command.add_argument('--max-mb', type=int, default=512)
+  args = parser.parse_args()
+
+  if args.command == 'invalidate':
+    removed = invalidate(args.input_file, args.cache_dir)
+  elif args.command == 'clear':
+    removed = invalidate(None, args.cache_dir)
+  else:
+    removed = len(evict(args.cache_dir, args.max_mb * 1024 * 1024))
+  print(f"Removed {removed} cached parse(s) from {args.cache_dir}")
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
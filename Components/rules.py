@@ -0,0 +1,125 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# A row-local check: the row gets the message when every column in
+# blank_columns is empty and the row's device type is in scope.
+IssueRule = namedtuple('IssueRule', ['message', 'blank_columns', 'scope'])
+
+MONITOR_DEVICE_TYPES = ['workstation', 'laptop', 'desktop']
+
+# The rules in the order their messages are written to the Issues column
+ISSUE_RULES = [
+    IssueRule("/missing a floor plan", ["Flr Pln L", "Flr Pln N"], 'all'),
+    IssueRule("/needs a designator", ["Flr Pln D"], 'all'),
+    IssueRule("/needs a monitor make", ["WS_Mon_Make_1"], 'monitor'),
+    IssueRule("/needs a monitor model", ["WS_Mon_Mod_1"], 'monitor'),
+    IssueRule("/needs a monitor size", ["Mon 1"], 'monitor'),
+    IssueRule("/Missing printer Type", ["PRNT_Type"], 'printer'),
+    IssueRule("/Missing printer IP", ["Network Pntr IP"], 'printer'),
+    IssueRule("/Missing printer Queue Name", ["PRNT_Queue_Name"], 'printer'),
+    IssueRule("/Missing printer Make", ["PRNT_Make"], 'printer'),
+    IssueRule("/Missing printer Model", ["PRNT_Model"], 'printer'),
+]
+
+# Each rule owns one bit of the per-row issue bitmask, in rule order.
+# Issues are kept as bitmasks and only rendered to text for output.
+ISSUE_CODES = {rule.message: 1 << bit for bit, rule in enumerate(ISSUE_RULES)}
+ISSUE_MESSAGES = {code: message for message, code in ISSUE_CODES.items()}
+ISSUE_DTYPE = np.uint64
+
+
+def rule_columns(rules=ISSUE_RULES):
+  # Columns the rules read: the device type and every checked column
+  columns = ["Type"]
+  for rule in rules:
+    columns += [name for name in rule.blank_columns if name not in columns]
+  return columns
+
+
+def scope_masks(frame):
+  """
+    Compute which rows each rule scope applies to.
+
+    Args:
+        frame (DataFrame): The loaded ITAM rows.
+
+    Returns:
+        dict: {scope name: boolean Series}
+  """
+  device_types = frame["Type"].fillna("").astype(str).str.lower()
+  return {
+      'all': pd.Series(True, index=frame.index),
+      'monitor': device_types.isin(MONITOR_DEVICE_TYPES),
+      'printer': device_types.str.contains("printer", regex=False),
+  }
+
+
+def evaluate_rules(frame, rules=ISSUE_RULES):
+  """
+    Evaluate every rule over the whole table at once.
+
+    Args:
+        frame (DataFrame): The loaded ITAM rows.
+        rules (list): IssueRule entries to evaluate.
+
+    Returns:
+        Series: Issue bitmask per row (see ISSUE_CODES), indexed like frame.
+  """
+  scopes = scope_masks(frame)
+  issue_bits = np.zeros(len(frame), dtype=ISSUE_DTYPE)
+  for rule in rules:
+    mask = scopes[rule.scope]
+    for column in rule.blank_columns:
+      mask = mask & frame[column].isna()
+    issue_bits[mask.to_numpy()] |= ISSUE_DTYPE(ISSUE_CODES[rule.message])
+  return pd.Series(issue_bits, index=frame.index)
+
+
+def rows_with(issue_bits, codes):
+  """
+    Find the rows that have any of the given issues.
+
+    Args:
+        issue_bits (Series): Issue bitmask per row.
+        codes (int): One or more ISSUE_CODES values OR-ed together.
+
+    Returns:
+        Series: Boolean mask of the matching rows.
+  """
+  return (issue_bits & ISSUE_DTYPE(codes)) != 0
+
+
+def issue_counts(issue_bits):
+  """
+    Count the issues of every row (the popcount of its bitmask).
+
+    Args:
+        issue_bits (Series): Issue bitmask per row.
+
+    Returns:
+        Series: Number of issues per row.
+  """
+  counts = np.zeros(len(issue_bits), dtype=np.int64)
+  values = issue_bits.to_numpy()
+  for code in ISSUE_MESSAGES:
+    counts += (values & ISSUE_DTYPE(code)) != 0
+  return pd.Series(counts, index=issue_bits.index)
+
+
+def render_issues(issue_bits):
+  """
+    Build the Issues text of every row from its bitmask.
+
+    Args:
+        issue_bits (Series): Issue bitmask per row.
+
+    Returns:
+        Series: Concatenated issue messages per row, "" when there are none.
+  """
+  values = issue_bits.to_numpy()
+  issues = np.full(len(values), "", dtype=object)
+  for code, message in ISSUE_MESSAGES.items():
+    issues = issues + np.where((values & ISSUE_DTYPE(code)) != 0, message, "")
+  return pd.Series(issues, index=issue_bits.index, dtype=object)
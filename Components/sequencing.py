@@ -0,0 +1,219 @@
+from Components.designators import number_runs, parse_designator
+
+
+class FloorPlanSequence:
+  """
+    Designator numbering of one device class on a single floor plan.
+    Every class is numbered on its own, so P1 next to W1 is no repeat.
+
+    The numbers in use are kept as a bitset over the floor's range,
+    bit i standing for number low + i, so thousands of designators per
+    floor cost a few hundred bytes and gaps fall out of one bitwise not.
+
+    Attributes:
+        floor_plan (str): The floor plan the designators are on.
+        device_class (str): Their Designator.device_class, None for
+            prefixes of no known class.
+        designators (list): Sorted designators of the class on the floor plan.
+        numbers (list): Sorted designator numbers, repeats included.
+        low (int): Lowest number of the floor's range, None without numbers.
+        high (int): Highest number of the floor's range.
+        used (int): Bitset of the numbers used within low..high.
+        runs (list): (first, last) runs of consecutive numbers in use.
+        gaps (list): Numbers missing between low and high.
+        gap_ranges (list): The gaps as (first, last) runs.
+        duplicates (dict): {number: rows} for numbers used more than once.
+        out_of_sequence_rows (list): Rows repeating a number already used.
+        out_of_range (dict): {number: rows} for numbers outside low..high.
+        unnumbered_rows (list): Rows whose designator has no number.
+        sequential (bool): True when the numbers run without gaps,
+            repeats or numbers out of range.
+  """
+
+  def __init__(self, floor_plan, device_class=None):
+    self.floor_plan = floor_plan
+    self.device_class = device_class
+    self.designators = []
+    self.numbers = []
+    self.low = None
+    self.high = None
+    self.used = 0
+    self.runs = []
+    self.gaps = []
+    self.gap_ranges = []
+    self.duplicates = {}
+    self.out_of_sequence_rows = []
+    self.out_of_range = {}
+    self.unnumbered_rows = []
+    self.sequential = True
+
+  def has(self, number):
+    # True when number is in use within the floor's range
+    return (self.low is not None and self.low <= number <= self.high and
+            bool(self.used >> (number - self.low) & 1))
+
+  def add_numbers(self, rows_by_number):
+    """
+      Fill in the analysis from the rows using each number.
+
+      Args:
+          rows_by_number (dict): {number: rows in sheet order}
+    """
+    distinct = sorted(rows_by_number)
+    for number in distinct:
+      rows = rows_by_number[number]
+      self.numbers.extend([number] * len(rows))
+      if len(rows) > 1:
+        # The first row keeps the number, the others break the sequence
+        self.duplicates[number] = rows
+        self.out_of_sequence_rows.extend(rows[1:])
+    self.out_of_sequence_rows.sort()
+    if not distinct:
+      return
+
+    # The floor's range is the run of numbers without a jump larger
+    # than designators.MAX_SEQUENCE_JUMP that holds the most designators
+    clusters, main = number_runs(
+        distinct,
+        {number: len(rows) for number, rows in rows_by_number.items()})
+    self.low, self.high = main[0], main[-1]
+    for cluster in clusters:
+      if cluster is not main:
+        for number in cluster:
+          self.out_of_range[number] = rows_by_number[number]
+
+    for number in main:
+      self.used |= 1 << (number - self.low)
+    span = self.high - self.low + 1
+    self.runs = bit_runs(self.used, self.low)
+    self.gap_ranges = bit_runs(~self.used & ((1 << span) - 1), self.low)
+    self.gaps = [
+        number for first, last in self.gap_ranges
+        for number in range(first, last + 1)
+    ]
+    self.sequential = not (self.gaps or self.duplicates or self.out_of_range)
+
+
+def bit_runs(bits, offset=0):
+  """
+    Collapse the set bits of an int into (first, last) runs.
+
+    Args:
+        bits (int): The bitset.
+        offset (int): Number bit 0 stands for.
+
+    Returns:
+        list: (first, last) runs of consecutive set bits, ascending.
+  """
+  runs = []
+  position = 0
+  while bits:
+    # Skip the clear bits, then measure the run of set bits
+    skip = (bits & -bits).bit_length() - 1
+    bits >>= skip
+    position += skip
+    length = (~bits & (bits + 1)).bit_length() - 1
+    runs.append((offset + position, offset + position + length - 1))
+    bits >>= length
+    position += length
+  return runs
+
+
+def format_runs(runs):
+  # "3-5, 9" for [(3, 5), (9, 9)]
+  return ", ".join(str(first) if first == last else f"{first}-{last}"
+                   for first, last in runs)
+
+
+def sequence_key(floor_plan, designator):
+  """
+    Key of the sequence a record's designator belongs to.
+
+    Args:
+        floor_plan: The record's 'Flr Pln N' value.
+        designator: The record's 'Flr Pln D' value.
+
+    Returns:
+        tuple: (floor plan, device class), None for a record without
+        floor plan or designator, which belongs to no sequence.
+  """
+  if floor_plan is None or designator is None:
+    return None
+  floor_plan, designator = str(floor_plan).strip(), str(designator).strip()
+  if not floor_plan or not designator:
+    return None
+  return (floor_plan, parse_designator(designator).device_class)
+
+
+def build_sequence_index(entries):
+  """
+    Build the sequence index of every floor plan and device class in
+    one pass.
+
+    Args:
+        entries (iterable): (row, floor plan, designator) for every record.
+          Records with a blank floor plan or designator are skipped.
+
+    Returns:
+        dict: {(floor plan, device class): FloorPlanSequence}
+  """
+  sequence_index = {}
+  number_rows = {}
+  for row, floor_plan, designator in entries:
+    if not floor_plan or not designator:
+      continue
+    parsed = parse_designator(designator)
+    key = (floor_plan, parsed.device_class)
+    sequence = sequence_index.get(key)
+    if sequence is None:
+      sequence = sequence_index[key] = FloorPlanSequence(*key)
+      number_rows[key] = {}
+    sequence.designators.append(designator)
+    if parsed.number is not None:
+      number_rows[key].setdefault(parsed.number, []).append(row)
+    else:
+      sequence.unnumbered_rows.append(row)
+
+  for key, sequence in sequence_index.items():
+    sequence.designators.sort()
+    sequence.add_numbers(number_rows[key])
+  return sequence_index
+
+
+def sequence_report(sequence_index):
+  """
+    One line per floor plan and device class with the exact numbers
+    techs need to fix.
+
+    Args:
+        sequence_index (dict): Output of build_sequence_index().
+
+    Returns:
+        list: Dicts with the floor plan, the device class, its range, the
+        runs in use, the missing numbers, the repeated numbers with their
+        rows, the numbers out of range and the number of unnumbered
+        designators.
+  """
+  report = []
+  for key in sorted(sequence_index,
+                    key=lambda key: (key[0], key[1] or "")):
+    sequence = sequence_index[key]
+    report.append({
+        "Floor Plan": sequence.floor_plan,
+        "Device Class": sequence.device_class or "",
+        "Designators": len(sequence.designators),
+        "Range": "" if sequence.low is None else
+                 f"{sequence.low}-{sequence.high}",
+        "In Use": format_runs(sequence.runs),
+        "Missing": format_runs(sequence.gap_ranges),
+        "Missing Count": len(sequence.gaps),
+        "Repeated": "; ".join(
+            f"{number} (rows {', '.join(map(str, rows))})"
+            for number, rows in sorted(sequence.duplicates.items())),
+        "Out of Range": "; ".join(
+            f"{number} (rows {', '.join(map(str, rows))})"
+            for number, rows in sorted(sequence.out_of_range.items())),
+        "Unnumbered": len(sequence.unnumbered_rows),
+        "Sequential": sequence.sequential,
+    })
+  return report
@@ -0,0 +1,137 @@
+import re
+
+import pandas as pd
+
+from Components.designators import NEW_SCHEME, OLD_SCHEME
+
+# Columns that repeat a few hundred values across the whole export.
+# They are loaded as categoricals, so each value is stored once and
+# grouping on them compares integer codes.
+CATEGORICAL_COLUMNS = [
+    'Type', 'Department', 'Location', 'EPIC_BLDG', 'WS_Mon_Make_1',
+    'PRNT_Make', 'Flr Pln L', 'Flr Pln N'
+]
+
+# Shared part of a floor plan name: the floor, in any of the ways the
+# sites write it ("LIJMC - 3", "PBMC_fl_2_sec_2.1", "PBMC Floor 3 Sec 1")
+DEFAULT_FLOOR_PLAN_KEY = (r'^[A-Za-z]+(?:\s*-\s*|[\s_]*(?:fl|floor)[\s_]*)'
+                          r'(?P<key>\d+)')
+
+
+class SiteProfile:
+  """
+    What differs between the sites running the ITAM checks. Patterns are
+    compiled once, when the profile is created.
+
+    Args:
+        name (str): Short site name.
+        locations (str): Pattern matching the site's 'Location' values.
+        floor_plans (str): Pattern matching the site's floor plan names.
+        floor_plan_key (str): Pattern whose 'key' group is the part of a
+            floor plan name that floor plans of the same floor share.
+        designator_schemes (tuple): Designator numberings in use at the
+            site (designators.OLD_SCHEME, designators.NEW_SCHEME).
+        designator_prefixes (tuple): Designator prefixes the site uses
+            on top of designators.KNOWN_PREFIXES.
+        categorical_columns (list): Columns of the site's export loaded
+            as categoricals, see data_processing.to_categoricals.
+  """
+
+  def __init__(self,
+               name,
+               locations,
+               floor_plans,
+               floor_plan_key=DEFAULT_FLOOR_PLAN_KEY,
+               designator_schemes=(OLD_SCHEME, NEW_SCHEME),
+               designator_prefixes=(),
+               categorical_columns=CATEGORICAL_COLUMNS):
+    self.name = name
+    self.locations = re.compile(locations, re.IGNORECASE)
+    self.floor_plans = re.compile(floor_plans, re.IGNORECASE)
+    self.floor_plan_key = re.compile(floor_plan_key, re.IGNORECASE)
+    self.designator_schemes = tuple(designator_schemes)
+    self.designator_prefixes = tuple(
+        prefix.upper() for prefix in designator_prefixes)
+    self.categorical_columns = list(categorical_columns)
+
+  def __repr__(self):
+    return f"SiteProfile({self.name!r})"
+
+  def floor_plan_keys(self, floor_plans):
+    """
+      Shared part of every floor plan name, in one vectorized extraction.
+
+      Args:
+          floor_plans (Series): The 'Flr Pln N' column.
+
+      Returns:
+          Series: The key of each floor plan, "" where the name doesn't
+          match floor_plan_key.
+    """
+    keys = floor_plans.astype('string').str.strip().str.extract(
+        self.floor_plan_key)['key']
+    return keys.fillna('').astype(object)
+
+
+SITE_PROFILES = [
+    SiteProfile('LIJ',
+                locations=r'Long Island Jewish|\bLIJ',
+                floor_plans=r'^LIJ',
+                floor_plan_key=r'^(?P<key>LIJMC - \d+)'),
+    SiteProfile('PBMC',
+                locations=r'Peconic Bay|\bPBMC',
+                floor_plans=r'^PBMC',
+                designator_prefixes=('T', )),
+    SiteProfile('SIUHN',
+                locations=r'Staten Island University Hospital North|\bSIUH',
+                floor_plans=r'^SIUH'),
+    SiteProfile('GCH', locations=r'Glen Cove|\bGCH', floor_plans=r'^GCH'),
+]
+
+# Used when no profile matches the export
+DEFAULT_SITE = SiteProfile('Unknown', locations=r'(?!)', floor_plans=r'(?!)')
+
+
+def site_profile(name):
+  # The profile called name, case-insensitively
+  for profile in SITE_PROFILES:
+    if profile.name.lower() == name.lower():
+      return profile
+  raise ValueError(f"Unknown site {name!r}, expected one of "
+                   f"{', '.join(profile.name for profile in SITE_PROFILES)}")
+
+
+def detection_columns(header):
+  # The columns of header detect_site() looks at
+  return [name for name in ('Location', 'Flr Pln N') if name in header]
+
+
+def detect_site(records, profiles=SITE_PROFILES):
+  """
+    Tell the site of an export from its 'Location' values, or from its
+    floor plan names when no location matches. Each distinct value is
+    matched once and votes with the number of rows holding it.
+
+    Args:
+        records (DataFrame): The export, or at least its Location and
+            'Flr Pln N' columns.
+        profiles (list): Candidate SiteProfiles.
+
+    Returns:
+        SiteProfile: The profile matching the most rows, DEFAULT_SITE if
+        none matches.
+  """
+  for column, pattern in (('Location', 'locations'), ('Flr Pln N',
+                                                      'floor_plans')):
+    if column not in records:
+      continue
+    votes = dict.fromkeys(profiles, 0)
+    counts = pd.Series(records[column]).dropna().astype(str).value_counts()
+    for value, count in counts.items():
+      for profile in profiles:
+        if getattr(profile, pattern).search(value):
+          votes[profile] += count
+    best = max(votes, key=votes.get, default=None)
+    if best is not None and votes[best]:
+      return best
+  return DEFAULT_SITE
@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 from datetime import datetime
+from Components.data_processing import flag_duplicates
+from Components.file_io import read_excel_file
 
 
 def find_duplicates_and_missing_data(input_file):
@@ -22,7 +24,7 @@ def find_duplicates_and_missing_data(input_file):
   current_time = datetime.now().strftime('%H%M%S')
 
   # Read the Excel file
-  df = pd.read_excel(input_file, skiprows=1)
+  df = read_excel_file(input_file, skiprows=1)
 
   # Clean up 'Flr Pln D' column by removing leading and trailing spaces
   df['Flr Pln D'] = df['Flr Pln D'].str.strip()
@@ -60,24 +62,12 @@ def find_duplicates_and_missing_data(input_file):
 
     df.loc[idx, 'Suggested Designator'] = new_designator
   '''
-  # Find records where both 'Flr Pln N' and 'Flr Pln D', New URL and Designator,
-  # match on two or more occurrences
-  duplicates_n_d = df.groupby(['Flr Pln N',
-                               'Flr Pln D']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Department', Department and Designator,
-  # match on two or more occurrences
-  duplicates_d_id = df.groupby(['Flr Pln D',
-                                'Department']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Flr Pln L', Old URL and Designator,
-  # match on two or more occurrences
-  dupe_d_l = df.groupby(['Flr Pln D',
-                         'Flr Pln L']).filter(lambda x: len(x) >= 2)
-
-  # Concatenate the results
-  duplicates = pd.concat([duplicates_n_d, duplicates_d_id, dupe_d_l],
-                         ignore_index=True)
+  # Flag records that share a designator with another record on the
+  # New URL, the Old URL or the Department in one vectorized pass.
+  # 'Duplicate Rules' holds a bitmask of which of those pairs matched,
+  # so a record matching several pairs is only listed once.
+  df['Duplicate Rules'] = flag_duplicates(df)
+  duplicates = df[df['Duplicate Rules'] != 0].copy()
 
   # Find records with missing data in the Floor Plan URL column (e.g., 'Flr Pln N')
   missing_data = df[df['Flr Pln N'].isna()]
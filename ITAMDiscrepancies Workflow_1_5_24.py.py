@@ -1,9 +1,12 @@
 import os
 import pandas as pd
 from datetime import datetime
+from Components.data_processing import (build_duplicate_index,
+                                         find_duplicate_ids, flag_duplicates)
 
 #from Components.data_processing import clean_designators, find_duplicates
-#from Components.file_io import read_excel_file, save_to_csv
+from Components.file_io import read_excel_file
+#from Components.file_io import save_to_csv
 
 
 def find_duplicates_and_missing_data(input_file, expected_count=None):
@@ -38,7 +41,7 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
   current_time = datetime.now().strftime('%H%M%S')
 
   # Read the Excel file
-  df = pd.read_excel(input_file, skiprows=1)
+  df = read_excel_file(input_file, skiprows=1)
   print(df.head())  # Print the first few rows of the dataframe
 
   # Clean up 'Flr Pln D' column by removing leading and trailing spaces
@@ -104,56 +107,17 @@ def find_duplicates_and_missing_data(input_file, expected_count=None):
   '''
   print("End of find_duplicates_and_missing_data")
 
-  def find_duplicate_designators(row, df):
-    # Find the ID of the record causing a duplicate.
-
-    designator = row['Flr Pln D']
-    department = row['Department']
-    newFlrPln = row['Flr Pln N']
-    oldFlrPln = row['Flr Pln L']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Flr Pln N'
-    if pd.notna(designator) and pd.notna(newFlrPln):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Flr Pln N'] == newFlrPln)].iloc[0]
-      return duplicate_row['ID']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Flr Pln L'
-    if pd.notna(designator) and pd.notna(oldFlrPln):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Flr Pln L'] == oldFlrPln)].iloc[0]
-      return duplicate_row['ID']
-
-    # Check for duplicates based on 'Flr Pln D' and 'Department'
-    if pd.notna(designator) and pd.notna(department):
-      duplicate_row = df[(df['Flr Pln D'] == designator)
-                         & (df['Department'] == department)].iloc[0]
-      return duplicate_row['ID']
-
-    return None
-
-  # Find records where both 'Flr Pln N' and 'Flr Pln D', New URL and Designator,
-  # match on two or more occurrences
-  duplicates_n_d = df.groupby(['Flr Pln N',
-                               'Flr Pln D']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Department', Department and Designator,
-  # match on two or more occurrences
-  duplicates_d_dept = df.groupby(['Flr Pln D',
-                                  'Department']).filter(lambda x: len(x) >= 2)
-
-  # Find records where both 'Flr Pln D' and 'Flr Pln L', Old URL and Designator,
-  # match on two or more occurrences
-  dupe_d_l = df.groupby(['Flr Pln D',
-                         'Flr Pln L']).filter(lambda x: len(x) >= 2)
-
-  # Concatenate the results
-  duplicates = pd.concat([duplicates_n_d, duplicates_d_dept, dupe_d_l],
-                         ignore_index=True)
+  # Flag records that share a designator with another record on the
+  # New URL, the Old URL or the Department in one vectorized pass.
+  # 'Duplicate Rules' holds a bitmask of which of those pairs matched,
+  # so a record matching several pairs is only listed once.
+  df['Duplicate Rules'] = flag_duplicates(df)
+  duplicates = df[df['Duplicate Rules'] != 0].copy()
 
   # Add a new column 'Conflict_ID' to store the ID of the record causing a duplicate
-  duplicates['Conflict_ID'] = duplicates.apply(
-      lambda row: find_duplicate_designators(row, df), axis=1)
+  # The index is built once per run; each duplicate is then an O(1) lookup
+  duplicate_index = build_duplicate_index(df)
+  duplicates['Conflict_ID'] = find_duplicate_ids(duplicates, duplicate_index)
 
   # Assuming the df is the DataFrame with a column 'ID'
   # Replace 'your_id_column' with the actual column name if it's different
@@ -4,6 +4,7 @@ from shutil import copy2
 from datetime import datetime
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import PatternFill
+from Components.designators import parse_designator
 
 
 class DataProcessor:
@@ -194,17 +195,10 @@ class DataProcessor:
         elif data[1] is not None and data[2] is None:
           floorPlan = data[1][-1]
         if floorPlan and len(floorPlan) < 10:
-          designator = str(data[-1])
-          if isinstance(designator, str) and len(designator) > 1:
-            if designator.lower().startswith("wow"):
-              if designator[3] != floorPlan:
-                self.ws.cell(row=data[0], column=self.issueColumn).value += (
-                    "/floor plan and designator are different")
-              else:
-                self.ws.cell(row=data[0], column=self.issueColumn).value += (
-                    "/floor plan and designator are correct")
-          else:
-            if designator[1] != floorPlan:
+          # Only the new numbering (W2006, WOW2018) carries the floor
+          floor = parse_designator(str(data[-1]).strip()).floor
+          if floor is not None:
+            if str(floor) != floorPlan:
               self.ws.cell(row=data[0], column=self.issueColumn).value += (
                   "/floor plan and designator are different")
             else:
@@ -0,0 +1,188 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from sequencing_85_percent import DataProcessor
+from CodeEntropyDiscrepancyFinder import find_duplicates_and_missing_data
+from Components.data_processing import NO_FLAGGING_REASON
+from Components.rules import issue_counts
+
+# Pipelines a workbook can be run through
+PIPELINES = ["dataprocessor", "discrepancies"]
+
+
+def find_workbooks(source):
+  """
+    Collect the site workbooks to process.
+
+    Args:
+        source (str): A directory of workbooks or a glob pattern.
+
+    Returns:
+        list: Sorted workbook paths, Excel lock files ("~$...") excluded.
+  """
+  if os.path.isdir(source):
+    source = os.path.join(source, "*.xlsx")
+  return sorted(path for path in glob.glob(source)
+                if not os.path.basename(path).startswith("~$"))
+
+
+def run_dataprocessor(input_file, incremental=False):
+  # Highlight issues in a copy of the workbook with the DataProcessor
+  data_processor = DataProcessor(input_file)
+  data_processor.incremental = incremental
+  data_processor.process_data()
+  counts = issue_counts(data_processor.issue_bits)
+  return {
+      "rows": len(counts),
+      "flagged_rows": int((counts > 0).sum()),
+      "issues": int(counts.sum()),
+      "output_file": data_processor.output_file,
+  }
+
+
+def run_discrepancies(input_file):
+  # Write the discrepancy CSV with find_duplicates_and_missing_data.
+  # A record is listed once per check that caught it, so rows are
+  # counted by ID and issues by the flagging reasons of each record.
+  combined_data = find_duplicates_and_missing_data(input_file)
+  if combined_data.empty:
+    return {"rows": None, "flagged_rows": 0, "issues": 0, "output_file": None}
+  records = combined_data.drop_duplicates("ID")
+  reasons = records["Flagging Reason"].str.split(", ").explode()
+  return {
+      "rows": None,
+      "flagged_rows": int(combined_data["ID"].nunique()),
+      "issues": int(reasons.ne(NO_FLAGGING_REASON).sum()),
+      "output_file": None,
+  }
+
+
+def process_workbook(input_file, pipeline, incremental=False):
+  """
+    Run one workbook through a pipeline inside a worker process.
+
+    Errors are caught and reported in the summary so one bad export
+    doesn't stop the rest of the batch.
+
+    Args:
+        input_file (str): Path to the site workbook.
+        pipeline (str): One of PIPELINES.
+        incremental (bool): Reuse the site's stored results for rows
+            that haven't changed (dataprocessor only).
+
+    Returns:
+        dict: Summary row for the run summary.
+  """
+  # Every key is set up front, so failed runs still fill each column
+  summary = {
+      "input_file": input_file,
+      "pipeline": pipeline,
+      "status": "ok",
+      "error": None,
+      "rows": None,
+      "flagged_rows": None,
+      "issues": None,
+      "output_file": None,
+  }
+  start = time.perf_counter()
+  try:
+    if pipeline == "dataprocessor":
+      summary.update(run_dataprocessor(input_file, incremental))
+    else:
+      summary.update(run_discrepancies(input_file))
+  except Exception as e:
+    summary["status"] = "failed"
+    summary["error"] = f"{type(e).__name__}: {e}"
+  summary["seconds"] = round(time.perf_counter() - start, 2)
+  return summary
+
+
+def run_batch(workbooks, pipeline, max_workers=None, incremental=False):
+  """
+    Fan the workbooks out across a process pool.
+
+    Args:
+        workbooks (list): Workbook paths to process.
+        pipeline (str): One of PIPELINES.
+        max_workers (int): Worker processes, defaults to one per CPU.
+        incremental (bool): See process_workbook().
+
+    Returns:
+        DataFrame: One summary row per workbook, in input order.
+  """
+  max_workers = max_workers or os.cpu_count() or 1
+  max_workers = max(1, min(max_workers, len(workbooks)))
+  summaries = []
+  with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    futures = [
+        executor.submit(process_workbook, workbook, pipeline, incremental)
+        for workbook in workbooks
+    ]
+    for future in as_completed(futures):
+      summary = future.result()
+      print(f"{summary['status']}: {summary['input_file']} "
+            f"in {summary['seconds']}s")
+      summaries.append(summary)
+
+  order = {workbook: index for index, workbook in enumerate(workbooks)}
+  summaries.sort(key=lambda summary: order[summary["input_file"]])
+  return pd.DataFrame(summaries)
+
+
+def write_summary(summary, output_folder="Outputs/summary"):
+  # Write the consolidated run summary next to the other outputs
+  os.makedirs(output_folder, exist_ok=True)
+  current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+  summary_file = os.path.join(output_folder,
+                              f"run_summary_{current_datetime}.csv")
+  summary.to_csv(summary_file, index=False)
+  return summary_file
+
+
+def main():
+  """
+    Process every site workbook in a directory or glob in parallel
+    and write a consolidated run summary.
+  """
+  parser = argparse.ArgumentParser(
+      description="Validate a batch of ITAM site workbooks.")
+  parser.add_argument("source",
+                      help="Directory of .xlsx workbooks or a glob pattern")
+  parser.add_argument("--pipeline",
+                      choices=PIPELINES,
+                      default="dataprocessor",
+                      help="Checks to run on each workbook")
+  parser.add_argument("--workers",
+                      type=int,
+                      default=None,
+                      help="Worker processes (default: one per CPU)")
+  parser.add_argument("--incremental",
+                      action="store_true",
+                      help="Only re-check rows changed since the last export "
+                      "of each site")
+  args = parser.parse_args()
+
+  workbooks = find_workbooks(args.source)
+  if not workbooks:
+    print(f"No workbooks found in {args.source}")
+    return 1
+
+  print(f"Processing {len(workbooks)} workbook(s) with {args.pipeline}...\n")
+  summary = run_batch(workbooks, args.pipeline, args.workers,
+                      args.incremental)
+  summary_file = write_summary(summary)
+
+  print(summary[["input_file", "status", "seconds", "flagged_rows"]])
+  print(f"\nRun summary written to {summary_file}")
+  return 0 if (summary["status"] == "ok").all() else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
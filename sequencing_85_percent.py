@@ -1,46 +1,114 @@
-import re, os, sys, logging, random
+import re, os, sys, logging, random, time
 from shutil import copy2
 #from typing import Union
 from datetime import datetime
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import PatternFill
 from collections import Counter
+import pandas as pd
+from Components.data_processing import duplicate_clusters
+from Components.designators import DEVICE_CLASSES, parse_designator
+from Components.file_io import (ColumnProjection, RowStore,
+                                save_workbook_atomic, stream_workbook,
+                                unique_output_file)
+from Components.highlighting import (DUPLICATE_COLOR, SEVERITY_COLORS,
+                                     FillCache, add_severity_rules)
+from Components.incremental import ResultStore, diff_snapshot, row_hashes
+from Components.rules import (ISSUE_CODES, ISSUE_DTYPE, ISSUE_RULES,
+                              MONITOR_DEVICE_TYPES, evaluate_rules,
+                              issue_counts, render_issues, rule_columns)
+from Components.sites import detect_site, detection_columns, site_profile
+from Components.sequencing import (FloorPlanSequence, build_sequence_index,
+                                   sequence_key, sequence_report)
 
 
 class DataProcessor:
 
   def update_headers(self):
-    # Remove the "Department_ID" column
-    for row in self.ws.iter_rows(min_row=1, max_row=1):
-      for cell in row:
-        if cell.value == "Department_ID":
-          self.ws.delete_cols(cell.column, 1)
-          break
-
-    # Update other headers and column index map
-    header_row = self.ws[1]
-    column_names = [cell.value for cell in header_row]
-    self.column_index_map = {
-        name: index + 1
-        for index, name in enumerate(column_names)
-    }
-
-  def __init__(self):
-    self.input_file = "LIJ 2_2_24.xlsx"
+    # The row store was read in its final layout (see self.projection),
+    # so the output sheet only gets the projected header row and its
+    # new columns cleared; no columns are deleted or shifted
+    if not self.projection.in_place(self.rows.source_header):
+      raise ValueError(
+          "The column projection moves columns of the input workbook, "
+          "use output_mode 'streaming' or 'flagged' to write it")
+    for column, name in enumerate(self.rows.header, start=1):
+      self.ws.cell(row=self.rows.header_row, column=column).value = name
+      if name not in self.rows.source_header:
+        for (cell, ) in self.ws.iter_rows(min_row=self.rows.first_row,
+                                          max_row=self.rows.max_row,
+                                          min_col=column,
+                                          max_col=column):
+          cell.value = None
+
+    # Update the column index map
+    self.column_index_map = dict(self.rows.column_index_map)
+
+  def __init__(self, input_file="LIJ 2_2_24.xlsx", site=None):
+    self.input_file = input_file
+    # Site profile (see Components.sites), detected from the export's
+    # Location column unless a site name is given
+    self.site = None if site is None else site_profile(site)
     self.output_file = None
+    self.wb = None
+    self.ws = None
+    # Issue bitmask per sheet row (see Components.rules.ISSUE_CODES),
+    # free-text notes that aren't rules, and fills waiting for the
+    # output workbook
+    self.issue_bits = None
+    self.issue_notes = {}
+    self.pending_fills = {}
+    # Duplicate cluster and cluster size per sheet row, see
+    # check_duplicate_designators(), and the designator cells of the
+    # rows repeating their cluster, painted over the row fills
+    self.duplicate_clusters = None
+    self.duplicate_fills = {}
+    # One shared fill per colour for every highlight on the sheet
+    self.fill_cache = FillCache()
+    # "fills" paints highlighted cells, "conditional" writes a few
+    # conditional formatting rules in save_output_file() instead.
+    # "streaming" writes the sheet row by row from the row store without
+    # loading the input workbook, "flagged" does the same for the
+    # flagged rows only, see stream_output_file()
+    self.output_mode = "fills"
+    # With incremental set, only rows that changed since the site's last
+    # export are checked again, see flag_changed_rows()
+    self.incremental = False
+    self.result_store = ResultStore.for_input(input_file)
+    # Layout of the rows as they are read: "Issues" takes the place of
+    # "Department_ID" (Column F)
+    self.projection = ColumnProjection(drop=["Department_ID"],
+                                       insert={"Issues": 6})
 
   def process_data(self):
     print(f"Beginning of process_data: {self.output_file}")
     self.setup_logging()
-    self.load_Data()
-    self.flagging_issues()
-    self.highlight_Issues()
-    self.highlight_duplicate_des(
-        "dummy message")  # Call the method with a dummy message
-    self.save_output_file()
+    # Every stage only changes the workbook in memory;
+    # save_output_file() writes it exactly once at the end
+    self.timings = {}
+    self.timed("load", self.load_Data)
+    self.timed("flagging", self.flagging_issues)
+    self.timed("open output", self.open_output_workbook)
+    self.timed("highlighting", self.highlight_Issues)
+    self.timed("save", self.save_output_file)
+    self.timed("sequence report", self.save_sequence_report)
+    self.report_timings()
     print(f"Ending of process_data: {self.output_file}")
     return None
 
+  def timed(self, stage, function, *args):
+    # Run one stage of process_data and record how long it took
+    start = time.perf_counter()
+    result = function(*args)
+    self.timings[stage] = time.perf_counter() - start
+    return result
+
+  def report_timings(self):
+    report = ", ".join(f"{stage} {seconds:.2f}s"
+                       for stage, seconds in self.timings.items())
+    report = f"Timing report: {report}, total {sum(self.timings.values()):.2f}s"
+    print(report)
+    logging.info(report)
+
   def setup_logging(self):
     #this function sets up logging, and sets up the directory to log data to.
     output_folder = 'Outputs/'
@@ -53,172 +121,194 @@ class DataProcessor:
         format='%(asctime)s - %(levelname)s - %(message)s')  # format 3
 
   def load_Data(self):
-    # This function loads data from the excel sheet and adds a column for issues
-    # The "Issues" column will be the first column (column 1)
+    # This function streams the sheet once into a compact row store.
+    # All the checks read from self.rows; the styled workbook is only
+    # opened by open_output_workbook() once the checks are finished.
+    self.rows = RowStore.from_workbook(self.input_file,
+                                       header_row=2,
+                                       projection=self.projection)
+    if self.site is None:
+      self.site = detect_site(
+          self.rows.to_frame(detection_columns(self.rows.header)))
+    print(f"Site: {self.site.name}")
+    # The checks only read the columns in working_columns()
+    self.frame = self.rows.to_frame(self.working_columns())
+
+    # The projection placed the "Issues" column (Column F by default)
+    self.issueColumn = self.rows.column_index_map["Issues"]
+    self.issue_bits = pd.Series(ISSUE_DTYPE(0), index=self.frame.index)
+
+    self.initialize_column_index_map()
+
+    # Sequencing is checked against an index built once per load,
+    # incremental runs only build it for the floor plans that changed
+    if not self.incremental:
+      self.build_sequence_index()
+    return None
+
+  def open_output_workbook(self):
+    # This function opens the styled workbook and writes the issues into it.
+    # It is the only place the full workbook is loaded.
+    if self.streaming_output():
+      # The output is written from the row store by stream_output_file()
+      return None
 
     self.wb = load_workbook(self.input_file, read_only=False, data_only=False)
     self.ws = self.wb.active  # This part picks the first sheet on the excel
 
-    # Call update_headers() to remove "Department_ID" and update other headers
+    # Call update_headers() to write the projected headers
     self.update_headers()
 
-    # Add the "Issues" column at the same column position as "Department_ID"
-    self.issueColumn = 6  # Column F
-    self.ws.cell(row=2, column=self.issueColumn).value = "Issues"
-
-    self.initialize_column_index_map()  # Run after adding column for issues
+    # Issues are only rendered to text here
+    for i, issue_text in self.render_issue_text().items():
+      self.ws.cell(row=i, column=self.issueColumn).value = issue_text
     for c in self.ws["CD"]:
       c.value = ""
+
+    # Apply the fills requested by the checks while the sheet was not loaded
+    for (row_id, column_id), color in self.pending_fills.items():
+      self.fill_cache.fill_cell(self.ws, row_id, column_id, color)
     return None
 
+  def add_issue(self, row_id, message):
+    # Flag an issue on a row; messages without a rule are kept as notes
+    if message in ISSUE_CODES:
+      self.issue_bits[row_id] |= ISSUE_DTYPE(ISSUE_CODES[message])
+    else:
+      self.issue_notes[row_id] = self.issue_notes.get(row_id, "") + message
+
+  def render_issue_text(self):
+    # Build the Issues text of every row from its bitmask and notes
+    issue_text = render_issues(self.issue_bits)
+    for row_id, note in self.issue_notes.items():
+      issue_text[row_id] += note
+    return issue_text
+
   def highlight_all_issues(self, row, column, color):
-    # First highlight function
-    def highlight_sequence_errors(self):
-      try:
-        for i in range(3, self.ws.max_row + 1):
-          # Your sequence error logic here
-          pass
-      except Exception as e:
-        print(f"Error occurred while highlighting sequence errors: {e}")
-
-    # Second highlight function
-    def highlight_duplicates(self):
-      try:
-        for i in range(3, self.ws.max_row + 1):
-          duplicate_message = self.ws.cell(row=i,
-                                           column=self.issueColumn).value
-          if "Duplicates with" in duplicate_message:
-            # Only apply red fill if there's a specific issue related to duplicates
-            issue_messages = duplicate_message.split(":")[1].strip()
-            if issue_messages:
-              new_id = int(issue_messages.split(",")[0])
-              # Apply red fill to the cell
-              for col_index in range(2, self.ws.max_column + 1):
-                cell = self.ws.cell(
-                    row=new_id, column=col_index)  # Use new_id instead of i
-                cell.fill = PatternFill(start_color='FF0000',
-                                        end_color='FF0000',
-                                        fill_type='solid')
-            else:
-              logging.warning("Issue with the number of IDs in duplicates.")
-      except Exception as e:
-        print(f"Error occurred while highlighting duplicates: {e}")
-
-    # Third highlight function
-    def highlight_printer_issues(self):
-      try:
-        for i in range(3, self.ws.max_row + 1):
-          # Your printer issues logic here
-          pass
-      except Exception as e:
-        print(f"Error occurred while highlighting printer issues: {e}")
-
-    # Fourth highlight function
-    def highlight_other_issues(self):
-      try:
-        for row in range(3, self.ws.max_row + 1):
-          issue_value = self.ws.cell(row=row, column=self.issueColumn).value
-          if issue_value:
-            color = None
-            if len(str(issue_value).split('/')) == 2:
-              color = "FFFF00"  # Yellow
-            elif len(str(issue_value).split('/')) == 3:
-              color = "FF8000"  # Orange
-            elif len(str(issue_value).split('/')) > 3:
-              color = "FF0000"  # Red
-            if color:
-              # Apply fill color to the entire row
-              for col_index in range(1, self.ws.max_column + 1):
-                self.ws.cell(row=row, column=col_index).fill = PatternFill(
-                    start_color=color, end_color=color, fill_type="solid")
-      except Exception as e:
-        print(f"Error occurred while highlighting other issues: {e}")
-
-  pass
+    # Highlight specific types of issues. Duplicates are highlighted
+    # while flagging, see highlight_duplicates()
+    self.highlight_sequence_errors()
+    self.highlight_printer_issues()
+
+  # First highlight function
+  def highlight_sequence_errors(self):
+    try:
+      for i in range(3, self.ws.max_row + 1):
+        # Your sequence error logic here
+        pass
+    except Exception as e:
+      print(f"Error occurred while highlighting sequence errors: {e}")
+
+  # Second highlight function
+  def highlight_duplicates(self):
+    # The first row of a duplicate cluster keeps its designator, the
+    # others get a red designator cell. The fills are only collected
+    # here: they go on after the row fills, which would otherwise hide them
+    self.duplicate_fills = {
+        (i, self.column_index_map["Flr Pln D"]): DUPLICATE_COLOR
+        for i in self.duplicate_repeats().index
+    }
+    return None
+
+  def duplicate_repeats(self):
+    # Cluster of every row repeating an earlier row of its cluster
+    clusters = self.duplicate_clusters
+    if clusters is None:
+      return pd.Series(dtype="int64")
+    clustered = clusters["Duplicate Cluster"][
+        clusters["Duplicate Cluster"] > 0]
+    return clustered[clustered.duplicated()]
+
+  # Third highlight function
+  def highlight_printer_issues(self):
+    try:
+      for i in range(3, self.ws.max_row + 1):
+        # Your printer issues logic here
+        pass
+    except Exception as e:
+      print(f"Error occurred while highlighting printer issues: {e}")
+
+  # Fourth highlight function
+  def highlight_other_issues(self):
+    try:
+      # The number of issues of a row is the popcount of its bitmask
+      counts = issue_counts(self.issue_bits)
+      rows_by_color = {
+          SEVERITY_COLORS[1]: counts.index[counts == 1],  # Yellow
+          SEVERITY_COLORS[2]: counts.index[counts == 2],  # Orange
+          SEVERITY_COLORS[3]: counts.index[counts > 2],  # Red
+      }
+      for color, rows in rows_by_color.items():
+        # Apply fill color to the entire row, one range of rows at a time
+        self.fill_cache.fill_rows(self.ws, rows, color)
+    except Exception as e:
+      print(f"Error occurred while highlighting other issues: {e}")
 
   def count_devices(self):
     # Initialize counts for laptops, WOWs, workstations, printers, and specialty printers
-    laptop_count = 0
-    wow_count = 0
-    workstation_count = 0
-    printer_count = 0
-    specialty_printer_count = 0
-
-    # Iterate over each row in the worksheet
-    for i in range(3, self.ws.max_row + 1):
-      # Check if the type is 'Workstation' or 'Printer'
-      device_type = self.ws.cell(
-          row=i, column=self.column_index_map["Type"]).value.lower()
-      if device_type == 'workstation':
-        # Check if the designator starts with
-        # 'W' for WOWs, 'L' for Laptops, or 'W{digits}' for Workstations
-        designator = str(
-            self.ws.cell(
-                row=i,
-                column=self.column_index_map["Flr Pln D"]).value).strip()
-        if designator:
-          if designator[0].lower() == 'l':
-            laptop_count += 1
-          elif designator.startswith('wow', 0, 3):
-            wow_count += 1
-          elif designator[0].lower() == 'w':
-            workstation_count += 1
-      elif device_type == 'printer':
-        # Check if the designator starts with 'P' for Printers or 'S' for Specialty Printers
-        designator = str(
-            self.ws.cell(
-                row=i,
-                column=self.column_index_map["Flr Pln D"]).value).strip()
-        if designator:
-          if designator[0].lower() == 'p':
-            printer_count += 1
-          elif designator[0].lower() == 's':
-            specialty_printer_count += 1
+    counts = {
+        device_class: 0
+        for device_class in ('Laptops', 'WOWs', 'Workstations', 'Printers',
+                             'Specialty Printers')
+    }
+    # Designator classes each device type is counted under:
+    # 'L' for Laptops, 'WOW' for WOWs or 'W' for Workstations,
+    # 'P' for Printers or 'S' for Specialty Printers
+    counted_classes = {
+        'workstation': {
+            DEVICE_CLASSES['L'], DEVICE_CLASSES['WOW'], DEVICE_CLASSES['W']
+        },
+        'printer': {DEVICE_CLASSES['P'], DEVICE_CLASSES['S']},
+    }
+
+    # Iterate over each row in the row store
+    for i in self.rows.row_numbers():
+      designator = self.rows.value(i, "Flr Pln D")
+      classes = counted_classes.get(
+          str(self.rows.value(i, "Type") or "").lower())
+      if designator is None or classes is None:
+        continue
+      # Each distinct designator is only parsed once
+      device_class = parse_designator(str(designator).strip()).device_class
+      if device_class in classes:
+        counts[device_class] += 1
 
     # Return the counts
-    return {
-        'Laptops': laptop_count,
-        'WOWs': wow_count,
-        'Workstations': workstation_count,
-        'Printers': printer_count,
-        'Specialty Printers': specialty_printer_count
-    }
+    return counts
 
   def add_issueColumn(self):
-    # Shift existing columns to the right to make space for the "Issues" column
-    for column in range(self.ws.max_column, 0, -1):
-      for row in range(3, self.ws.max_row + 1):
-        self.ws.cell(row=row, column=column + 1).value = self.ws.cell(
-            row=row, column=column).value
-      self.ws.cell(row=row, column=column).value
-
-    # Add the "Issues" column at the first column position in row 2
-    self.ws.cell(row=2, column=1).value = "Issues"
+    # Put the "Issues" column first with every other column one to the
+    # right. The projection places it while the sheet is read, so call
+    # this before load_Data(); the layout no longer lines up with the
+    # input workbook, so the output is streamed.
+    self.projection = ColumnProjection(insert={"Issues": 1})
+    if not self.streaming_output():
+      self.output_mode = "streaming"
+
+  def working_columns(self):
+    # Columns the checks read; the rest only go to the output
+    columns = [
+        "ID", "Flr Pln L", "Flr Pln N", "Flr Pln D", "Department", "Location",
+        "Serial", "Hostname"
+    ]
+    columns += [name for name in rule_columns() if name not in columns]
+    return [name for name in columns if name in self.rows.column_index_map]
 
   def initialize_column_index_map(self):
-    # This function initializes a dictionary to map column names to column indices
-    header_row = self.ws[2]
-    column_names = [cell.value for cell in header_row]
-    self.column_index_map = {
-        name: index + 1
-        for index, name in enumerate(column_names)
-    }
+    # This function initializes a dictionary to map column names to column indices.
+    # The row store is already in its final layout, "Issues" included.
+    header_row = list(self.rows.header)
+    self.column_index_map = dict(self.rows.column_index_map)
 
     print("Header Row: ", header_row)
     print("Column Index Map:", self.column_index_map)
 
   def validate_floor_plans(self):
-    # Extract all floor plans and designators from the worksheet
+    # Extract all floor plans and designators from the row store
     floor_plans_designators = [
-        (str(
-            self.ws.cell(
-                row=i,
-                column=self.column_index_map["Flr Pln N"]).value).strip(),
-         str(
-             self.ws.cell(
-                 row=i,
-                 column=self.column_index_map["Flr Pln D"]).value).strip())
-        for i in range(3, self.ws.max_row + 1)
+        (str(flr_pln_n).strip(), str(flr_pln_d).strip())
+        for flr_pln_n, flr_pln_d in zip(self.rows.column("Flr Pln N"),
+                                        self.rows.column("Flr Pln D"))
     ]
 
     # Initialize a dictionary to store designators for each floor plan
@@ -235,6 +325,24 @@ class DataProcessor:
 
     return floor_plan_designators_map
 
+  def build_sequence_index(self, floor_plans=None):
+    # This function maps each floor plan and device class to its
+    # designator numbers, gaps and out of sequence rows so
+    # sequence_check is a lookup.
+    # floor_plans limits the index to those floor plans.
+    self.sequence_index = build_sequence_index(
+        (i, str(flr_pln_n).strip(), str(flr_pln_d).strip())
+        for i, flr_pln_n, flr_pln_d in zip(self.rows.row_numbers(
+        ), self.rows.column("Flr Pln N"), self.rows.column("Flr Pln D"))
+        if flr_pln_n is not None and flr_pln_d is not None and (
+            floor_plans is None or str(flr_pln_n).strip() in floor_plans))
+
+    # Print the count of each floor plan name for debugging
+    print("Count of each floor plan name and device class:")
+    for (floor_plan, device_class), sequence in self.sequence_index.items():
+      print(f"{floor_plan} {device_class}: {len(sequence.designators)}")
+    return None
+
   def floorPlanIssues(self, data):
     #this function checks for missing floor plans
     #floor data[1] and data[2] are the old and new floor plans respectively
@@ -254,81 +362,53 @@ class DataProcessor:
   def find_monitor_issues(self, data):
     #this function checks for missing monitors
     #3 things can be missing on monitor info at Y,Z,AA
-    if self.ws[f"B{data[0]}"].value.lower() in "workstation,laptop,desktop":
+    device_type = str(self.rows.value(data[0], "Type") or "").lower()
+    if device_type in "workstation,laptop,desktop":
       if data[1] == None:
-        self.ws.cell(row=data[0], column=self.issueColumn).value = str(
-            self.ws.cell(
-                row=data[0],
-                column=self.issueColumn).value) + "/needs a monitor make"
+        self.add_issue(data[0], "/needs a monitor make")
       if data[2] == None:
-        self.ws.cell(row=data[0], column=self.issueColumn).value = str(
-            self.ws.cell(
-                row=data[0],
-                column=self.issueColumn).value) + "/needs a monitor model"
+        self.add_issue(data[0], "/needs a monitor model")
       if data[3] == None:
-        self.ws.cell(row=data[0], column=self.issueColumn).value = str(
-            self.ws.cell(
-                row=data[0],
-                column=self.issueColumn).value) + "/needs a monitor size"
+        self.add_issue(data[0], "/needs a monitor size")
     return None
 
   def check_duplicate_designators(self):
-    duplicates = {}
-    for i in range(3, self.ws.max_row + 1):
-      # Extract the shared portion of the floor plan name
-      flr_pln_n = str(
-          self.ws.cell(
-              row=i, column=self.column_index_map["Flr Pln N"]).value).strip()
-      flr_pln_d = str(
-          self.ws.cell(
-              row=i, column=self.column_index_map["Flr Pln D"]).value).strip()
-      if flr_pln_n and flr_pln_d:  # Ignore blanks
-        # Extract the shared portion of the floor plan name
-        floor_plan_shared = re.search(r'^LIJMC - \d+', flr_pln_n)
-        if floor_plan_shared:
-          floor_plan_shared = floor_plan_shared.group()
-        else:
-          floor_plan_shared = ""
-
-        condition = (flr_pln_d, floor_plan_shared)
-
-        # Check if the condition is already in the dictionary
-        # Mark conditions by row for spreed sheet
-        if condition in duplicates:
-          duplicates[condition].append(i)
-        else:
-          duplicates[condition] = [i]
-    for condition, rows in duplicates.items():
-      if len(rows) > 1:
-        self.ws.cell(row=rows[0], column=self.issueColumn).value = (
-            f"Duplicates with {', '.join(str(row) for row in rows if row != rows[0])}"
-        )
+    # Cluster rows sharing a designator on the same floor (the floor plan
+    # key of the site, see SiteProfile.floor_plan_key), a designator in
+    # the same department, a Serial or a Hostname; duplicates of
+    # duplicates end up in the same cluster
+    floor_plans = self.frame["Flr Pln N"]
+    floor_plan_keys = self.site.floor_plan_keys(floor_plans)
+    records = self.frame.assign(**{
+        "Floor Plan Key":
+        floor_plan_keys.mask(floor_plan_keys.eq(""), floor_plans)
+    })
+    self.duplicate_clusters = duplicate_clusters(
+        records,
+        keys=[("Flr Pln D", "Floor Plan Key"), ("Flr Pln D", "Department"),
+              ("Serial", ), ("Hostname", )])
+
+    # Mark clusters by row for spreed sheet
+    clustered = self.duplicate_clusters[
+        self.duplicate_clusters["Duplicate Cluster"] > 0]
+    for i, cluster, size in clustered.itertuples():
+      self.add_issue(i, f"/duplicate cluster {cluster} ({size} rows)")
+    print(f"Duplicate clusters: {clustered['Duplicate Cluster'].nunique()} "
+          f"covering {len(clustered)} rows")
 
   def sequence_check(self, row_id, flr_pln_L_value, flr_pln_N_value,
                      department_value, flr_pln_D_value):
     try:
-      print("sequence_check() start")
-
-      print("sequence_check() validate floor plans")
-
-      # Approach 3: Generate a list of designators for each valid floor plan
-      valid_floor_plans = self.validate_floor_plans()
-
-      # Print the count of each floor plan name for debugging
-      print("Count of each floor plan name:")
-      for floor_plan, designators in valid_floor_plans.items():
-        print(f"{floor_plan}: {len(designators)}")
-
-        # Check the sequence for each group of designators
-        # associated with a floor plan
-        if not self.are_designators_sequential(designators, floor_plan):
-          # Apply light yellow highlight to the cell with the issue
-          floor_plan_cell = self.ws.cell(
-              row=row_id, column=self.column_index_map["Flr Pln D"])
-          print("sequence_check() highlighting the cell")
-          self.highlight_cell(row_id, floor_plan_cell.column, "#FFFFCC")
+      # Look up the sequence of the row's device class on its floor plan
+      sequence = self.sequence_index.get(
+          sequence_key(flr_pln_N_value, flr_pln_D_value))
 
-      print("sequence_check() finish")
+      # Check the sequence for the group of designators
+      # associated with the floor plan
+      if sequence is not None and not sequence.sequential:
+        # Apply light yellow highlight to the cell with the issue
+        self.highlight_cell(row_id, self.column_index_map["Flr Pln D"],
+                            "FFFFCC")
 
     except Exception as e:
       print(
@@ -341,65 +421,60 @@ class DataProcessor:
   def are_designators_sequential(self, designators, floor_plan_name):
     """
       Check if the given list of designators is sequential based on the floor plan name.
+      Designators without a number are left out, a list without any
+      numbered designator counts as sequential.
       """
-    designator_numbers = []
+    rows_by_number = {}
     for designator in designators:
-      match = re.search(r'\d+', designator)
-      if match:
-        designator_numbers.append(int(match.group()))
+      parsed = parse_designator(designator)
+      if parsed.number is not None:
+        rows_by_number.setdefault(parsed.device_class,
+                                  {}).setdefault(parsed.number,
+                                                 []).append(None)
       else:
         print(
             f"No numerical part found for designator: {designator} in floor plan {floor_plan_name}"
         )
 
-    # Sort the designator numbers
-    sorted_numbers = sorted(designator_numbers)
-
-    # Check if the sorted numbers form a sequential sequence
-    return sorted_numbers == list(
-        range(min(sorted_numbers),
-              max(sorted_numbers) + 1))
+    # Each device class is numbered on its own; gaps, repeats and
+    # numbers out of range all break the sequence
+    for device_class, numbers in rows_by_number.items():
+      sequence = FloorPlanSequence(floor_plan_name, device_class)
+      sequence.add_numbers(numbers)
+      if not sequence.sequential:
+        return False
+    return True
 
   def printer_Issues(self, data):
     # This function looks for printer errors
     # data1 = bc data2 = bf data3 = bd data4 = bg data5 = bh
     # bc = type bf = ip bd = queue name bg = make bh = model
-    issue_message = ""
+    issue_messages = []
     if data[1] is None:
-      issue_message += "/Missing printer Type"
+      issue_messages.append("/Missing printer Type")
     if data[2] is None:
-      issue_message += "/Missing printer IP"
+      issue_messages.append("/Missing printer IP")
     if data[3] is None:
-      issue_message += "/Missing printer Queue Name"
+      issue_messages.append("/Missing printer Queue Name")
     if data[4] is None:
-      issue_message += "/Missing printer Make"
+      issue_messages.append("/Missing printer Make")
     if data[5] is None:
-      issue_message += "/Missing printer Model"
-
-    if issue_message:
-      current_issue_value = self.ws.cell(row=data[0],
-                                         column=self.issueColumn).value
-      if current_issue_value:
-        self.ws.cell(row=data[0], column=self.issueColumn).value += str(
-            issue_message)  # Convert to string before concatenation
-      else:
-        self.ws.cell(row=data[0], column=self.issueColumn).value = str(
-            issue_message)  # Convert to string before assignment
+      issue_messages.append("/Missing printer Model")
+
+    for issue_message in issue_messages:
+      self.add_issue(data[0], issue_message)
     return None
 
   def find_duplicates(self):
     # Initialize a dictionary to store duplicate records
     duplicates = {}
 
-    # Iterate over each row in the worksheet
-    for i in range(3, self.ws.max_row + 1):
+    # Iterate over each row in the row store
+    for i in self.rows.row_numbers():
       # Extract the necessary data for identifying duplicates
-      flr_pln_d = self.ws.cell(row=i,
-                               column=self.column_index_map["Flr Pln D"]).value
-      flr_pln_n = self.ws.cell(row=i,
-                               column=self.column_index_map["Flr Pln N"]).value
-      department = self.ws.cell(
-          row=i, column=self.column_index_map["Department"]).value
+      flr_pln_d = self.rows.value(i, "Flr Pln D")
+      flr_pln_n = self.rows.value(i, "Flr Pln N")
+      department = self.rows.value(i, "Department")
 
       # Define a condition based on the extracted data
       condition = (flr_pln_d, flr_pln_n, department)
@@ -425,119 +500,161 @@ class DataProcessor:
 
     # Step 2: Flag issues
     issue_messages = []
-    for i in range(3, self.ws.max_row + 1):
+    for i in self.rows.row_numbers():
       # Step 2a: Collect all issue messages for the current row
 
       # Step 2b: Check for floor plan and duplicate issues
       issue_messages.append(
-          self.floorPlanIssues(
-              [i, self.ws[f"K{i}"].value, self.ws[f"L{i}"].value]))
-      issue_messages.append(self.designatorIssues([i, self.ws[f"M{i}"].value]))
+          self.floorPlanIssues([
+              i,
+              self.rows.value(i, "Flr Pln L"),
+              self.rows.value(i, "Flr Pln N")
+          ]))
+      issue_messages.append(
+          self.designatorIssues([i, self.rows.value(i, "Flr Pln D")]))
 
       # Collect issue messages from other functions as well
 
       # Step 2c: Check for monitor issues:
       # checks for issues with monitor designator and floorplans
-      for i in range(3, self.ws.max_row + 1):
-        self.floorPlanIssues(
-            [i, self.ws[f"K{i}"].value, self.ws[f"L{i}"].value])
-        self.designatorIssues([i, self.ws[f"M{i}"].value])
+      for i in self.rows.row_numbers():
+        self.floorPlanIssues([
+            i,
+            self.rows.value(i, "Flr Pln L"),
+            self.rows.value(i, "Flr Pln N")
+        ])
+        self.designatorIssues([i, self.rows.value(i, "Flr Pln D")])
         # list may need to extend in future because monitor goes up to 4
         self.find_monitor_issues([
-            i, self.ws[f"Y{i}"].value, self.ws[f"Z{i}"].value,
-            self.ws[f"AA{i}"].value
+            i,
+            self.rows.value(i, "WS_Mon_Make_1"),
+            self.rows.value(i, "WS_Mon_Mod_1"),
+            self.rows.value(i, "Mon 1")
         ])
 
       # Step 2e: Check for printer issues:
-      if "printer" in self.ws.cell(
-          row=i, column=self.column_index_map["Type"]).value.lower():
+      if "printer" in str(self.rows.value(i, "Type") or "").lower():
         self.printer_Issues([
             i,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Type"]).value,
-            self.ws.cell(
-                row=i, column=self.column_index_map["Network Pntr IP"]).value,
-            self.ws.cell(
-                row=i, column=self.column_index_map["PRNT_Queue_Name"]).value,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Make"]).value,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Model"]).value
+            self.rows.value(i, "PRNT_Type"),
+            self.rows.value(i, "Network Pntr IP"),
+            self.rows.value(i, "PRNT_Queue_Name"),
+            self.rows.value(i, "PRNT_Make"),
+            self.rows.value(i, "PRNT_Model")
         ])
 
     # Step 3: collecting for sequence_check:
-    flr_pln_L_value = self.ws.cell(
-        row=i, column=self.column_index_map["Flr Pln L"]).value
-    flr_pln_N_value = self.ws.cell(
-        row=i, column=self.column_index_map["Flr Pln N"]).value
-    department_value = self.ws.cell(
-        row=i, column=self.column_index_map["Department"]).value
-    flr_pln_D_value = self.ws.cell(
-        row=i, column=self.column_index_map["Flr Pln D"]).value
+    flr_pln_L_value = self.rows.value(i, "Flr Pln L")
+    flr_pln_N_value = self.rows.value(i, "Flr Pln N")
+    department_value = self.rows.value(i, "Department")
+    flr_pln_D_value = self.rows.value(i, "Flr Pln D")
 
     # Step 3a: Check for sequence issues on data:
     self.sequence_check(i, flr_pln_L_value, flr_pln_N_value, department_value,
                         flr_pln_D_value)
 
     # Step 4: Combine issue messages into one string
-    for i in range(3, self.ws.max_row + 1):
+    for i in self.rows.row_numbers():
       combined_message = " ".join(msg for msg in issue_messages if msg)
-      self.ws.cell(row=i, column=self.issueColumn).value = combined_message
+      self.issue_notes[i] = combined_message
 
     return None
 
   def flagging_issues(self):
-    # Step 1: Call the find_duplicates method
-    duplicates = self.find_duplicates()
-
-    # Step 2: Flag issues
-    issue_messages = []
-    for i in range(3, self.ws.max_row + 1):
-      # Step 2a: Collect all issue messages for the current row
-      row_issues = []
-
-      # Step 2b: Check for floor plan and duplicate issues
-      row_issues.append(
-          self.floorPlanIssues(
-              [i, self.ws[f"K{i}"].value, self.ws[f"L{i}"].value]))
-      row_issues.append(self.designatorIssues([i, self.ws[f"M{i}"].value]))
-      self.find_monitor_issues([
-          i, self.ws[f"Y{i}"].value, self.ws[f"Z{i}"].value,
-          self.ws[f"AA{i}"].value
-      ])
-      if "printer" in self.ws.cell(
-          row=i, column=self.column_index_map["Type"]).value.lower():
-        self.printer_Issues([
-            i,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Type"]).value,
-            self.ws.cell(
-                row=i, column=self.column_index_map["Network Pntr IP"]).value,
-            self.ws.cell(
-                row=i, column=self.column_index_map["PRNT_Queue_Name"]).value,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Make"]).value,
-            self.ws.cell(row=i,
-                         column=self.column_index_map["PRNT_Model"]).value
-        ])
-
-      # Step 2c: Check for sequence issues on data:
-      self.sequence_check(
-          i,
-          self.ws.cell(row=i, column=self.column_index_map["Flr Pln L"]).value,
-          self.ws.cell(row=i, column=self.column_index_map["Flr Pln N"]).value,
-          self.ws.cell(row=i,
-                       column=self.column_index_map["Department"]).value,
-          self.ws.cell(row=i, column=self.column_index_map["Flr Pln D"]).value)
-
-      # Collect issue messages for the current row
-      issue_messages.append(row_issues)
-
-    # Step 3: Combine issue messages into one string for each row
-    for i in range(3, self.ws.max_row + 1):
-      combined_message = " ".join(msg for msg in issue_messages[i - 3] if msg)
-      self.ws.cell(row=i, column=self.issueColumn).value = combined_message
+    if self.incremental:
+      self.flag_changed_rows()
+    else:
+      # Step 1: Evaluate the row-local rules (floor plan, designator,
+      # monitor and printer checks) column-wise over the whole table
+      self.issue_bits = evaluate_rules(self.frame)
+
+      # Step 2: Check for sequence issues on data:
+      for i in self.rows.row_numbers():
+        self.sequence_check(i, self.rows.value(i, "Flr Pln L"),
+                            self.rows.value(i, "Flr Pln N"),
+                            self.rows.value(i, "Department"),
+                            self.rows.value(i, "Flr Pln D"))
+
+    # Step 3: Duplicates span the whole sheet, so they are clustered
+    # again on incremental runs as well
+    self.check_duplicate_designators()
+    self.highlight_duplicates()
+    return None
 
+  def result_signature(self):
+    # Stored results are only reused for the same layout and rules
+    return (self.rows.header, list(self.frame.columns), ISSUE_RULES,
+            MONITOR_DEVICE_TYPES)
+
+  def flag_changed_rows(self):
+    # This function checks only the rows whose values changed since the
+    # site's last export and reuses the stored results for the others.
+    # Sequencing is redone for every floor plan a changed row was or is on.
+    ids = self.frame["ID"]
+    hashes = pd.Series(row_hashes(self.frame).values, index=ids.values)
+    floor_plans = self.frame["Flr Pln N"].map(
+        lambda flr_pln_n: None if flr_pln_n is None else str(flr_pln_n).strip())
+
+    # Without unique IDs rows can't be matched between exports
+    keyed = ids.notna().all() and ids.is_unique
+    previous = self.result_store.load(
+        self.result_signature()) if keyed else None
+    if previous is None:
+      print("No previous results for this site, checking every row")
+      changed = pd.Series(True, index=self.frame.index)
+      touched = None
+    else:
+      diff = diff_snapshot(previous["row_hash"], hashes)
+      changed = ids.isin(diff.changed.union(diff.added))
+      touched = set(previous.loc[diff.changed.union(diff.removed),
+                                 "floor_plan"].dropna())
+      touched |= set(floor_plans[changed].dropna())
+      print(f"Incremental run: {len(diff.changed)} changed, "
+            f"{len(diff.added)} added, {len(diff.removed)} removed, "
+            f"{len(diff.unchanged)} reused, "
+            f"{len(touched)} floor plan(s) to re-sequence")
+
+    # Step 1: Row-local rules on the changed rows only
+    self.issue_bits = pd.Series(ISSUE_DTYPE(0), index=self.frame.index)
+    if changed.any():
+      self.issue_bits[changed] = evaluate_rules(self.frame[changed])
+    if not changed.all():
+      self.issue_bits[~changed] = previous.loc[ids[~changed],
+                                               "issue_bits"].values
+
+    # Step 2: Sequencing on the touched floor plans only
+    self.build_sequence_index(touched)
+    resequence = changed if touched is None else changed | floor_plans.isin(
+        touched)
+    sequence_flags = pd.Series(False, index=self.frame.index)
+    if resequence.any():
+      # Nothing to re-sequence when the export matches the last one
+      sequence_keys = [
+          sequence_key(floor_plan, designator)
+          for floor_plan, designator in zip(floor_plans[resequence],
+                                            self.frame["Flr Pln D"][resequence])
+      ]
+      sequence_flags[resequence] = [
+          key in self.sequence_index and
+          not self.sequence_index[key].sequential for key in sequence_keys
+      ]
+    if not resequence.all():
+      sequence_flags[~resequence] = previous.loc[ids[~resequence],
+                                                 "sequence_flag"].values
+    for i in sequence_flags.index[sequence_flags]:
+      # Apply light yellow highlight, as sequence_check does
+      self.highlight_cell(i, self.column_index_map["Flr Pln D"], "FFFFCC")
+
+    if keyed:
+      self.result_store.save(
+          pd.DataFrame(
+              {
+                  "row_hash": hashes.values,
+                  "issue_bits": self.issue_bits.values,
+                  "floor_plan": floor_plans.values,
+                  "sequence_flag": sequence_flags.values,
+              },
+              index=ids.values), self.result_signature())
     return None
 
 #
@@ -560,129 +677,103 @@ class DataProcessor:
     """
 
     print("start of highlight_cell()")
-    cell = self.ws.cell(row=row_id, column=column_id)
-    cell.fill = PatternFill(start_color=color,
-                            end_color=color,
-                            fill_type="solid")
+    if self.ws is None:
+      # The output workbook isn't open yet, open_output_workbook() applies it
+      self.pending_fills[(row_id, column_id)] = color
+    else:
+      self.fill_cache.fill_cell(self.ws, row_id, column_id, color)
     print("start of highlight_cell()")
 
   # old highlight issues
   def highlight_Issues(self):
+    if self.output_mode == "conditional" or self.streaming_output():
+      # Rows are highlighted when save_output_file() writes the sheet
+      return None
+
     # Highlight specific types of issues
     self.highlight_all_issues(row=3, column=self.issueColumn, color="FFFF00")
 
     # Highlight other issues based on frequency of errors
     self.highlight_other_issues()
 
-    def highlight_duplicate_des(self, duplicate_message=None):
-      logging.info(
-          f"Beginning of highlight_duplicate_des(self, duplicates): {self.output_file}"
-      )
-      try:
-        # Check if workbook and sheetnames exist.
-        if self.wb is not None and self.wb.sheetnames:
-          sheet_name = self.wb.sheetnames[0]
-          sheet = self.wb[sheet_name]
-
-          # Extract new_id from the duplicate_message
-          new_id = None
-
-          if duplicate_message is not None:
-            ids = re.findall(r'\d+', duplicate_message)
-            if len(ids) == 2:
-              new_id = int(ids[0])
-            else:
-              logging.warning("Incorrect number of IDs in duplicate_message.")
-
-          if new_id is not None:
-            # Apply red fill to the cell in the first column corresponding to new_id
-            for col_index in range(2, sheet.max_column + 1):
-              cell = sheet.cell(row=new_id, column=col_index)
-              cell.fill = PatternFill(start_color='FF0000',
-                                      end_color='FF0000',
-                                      fill_type='solid')
-
-            # Save the workbook
-            self.wb.save(filename=self.output_file)
-            logging.info(f"File Has Been Updated in {self.output_file}")
-
-        else:
-          logging.warning("Workbook is not defined. Unable to save.")
-
-      except Exception as e:
-        logging.error(f"Error occurred while highlighting duplicates: {e}")
-
-      finally:
-        logging.info(
-            f"Ending of highlight_duplicate_des(self, duplicate_message): "
-            f"{self.output_file}")
-
-      # Call the old functionality
-      self.old_highlight_duplicate_des(duplicate_message)
-
-    def old_highlight_duplicate_des(self, duplicate_message=None):
-      print(
-          f"Beginning of highlight_duplicate_des(self, duplicates): {self.output_file}"
-      )
-      try:
-        # Check if workbook and sheetnames exist.
-        if self.wb is not None and self.wb.sheetnames:
-          sheet_name = self.wb.sheetnames[0]
-          sheet = self.wb[sheet_name]
-          new_id = None
-          existing_id = None
-          if duplicate_message is not None:
-
-            # Extract IDs from the message generated in check_duplicate_designators()
-            print(f"Duplicate message: {duplicate_message}")
-            ids = re.findall(r'\d+', duplicate_message)
-            print(f"Extracted IDs: {ids}")
-
-            if len(ids) == 2:
-              new_id, existing_id = map(int, ids)
-
-              # Find the row index for the new_id
-              new_id_row = None
-              for row_index in range(2, sheet.max_row + 1):
-                current_id_cell = sheet.cell(row=row_index, column=1)
-                current_id_value = current_id_cell.value
-                if current_id_value == new_id:
-
-                  try:
-                    # Attempt to convert the current ID to an integer
-                    current_id = int(current_id_value)
-                  except (ValueError, TypeError):
-                    # Handle cases where 'ID' value is not a valid integer
-                    current_id = None
-                  if current_id == new_id:
-                    new_id_row = row_index
-                    break
-
-              #Check if the new_id_row is found
-              if new_id_row is not None:
-                # Apply red fill to the cell
-                for col_index in range(2, sheet.max_column + 1):
-                  cell = sheet.cell(row=new_id_row, column=col_index)
-                  cell.fill = PatternFill(start_color='FF0000',
-                                          end_color='FF0000',
-                                          fill_type='solid')
-
-                # Save the workbook
-                self.wb.save(filename=self.output_file)
-                print(f"File Has Been Updated in {self.output_file}")
-
-            else:
-              logging.warning("Duplicate message is None")
-
-        else:
-          logging.warning("Workbook is not defined. Unable to save.")
-
-      except Exception as e:
-        print(f"Error occurred while highlighting duplicates: {e}")
-
-      finally:
-        print(f"Ending of highlight_duplicate_des(self, duplicate_message): "
-              f"{self.output_file}")
+    # Red duplicate designators go over the row fills
+    for (row_id, column_id), color in self.duplicate_fills.items():
+      self.fill_cache.fill_cell(self.ws, row_id, column_id, color)
+
+    print(self.fill_cache.report())
+    logging.info(self.fill_cache.report())
+
+  def add_conditional_formatting(self):
+    # This function writes the issue count of each row and the duplicate
+    # cluster of the rows repeating their cluster to helper columns and
+    # lets Excel colour the rows with conditional formatting rules
+    severity_column = self.ws.max_column + 1
+    cluster_column = severity_column + 1
+    self.ws.cell(row=2, column=severity_column).value = "Issue Count"
+    self.ws.cell(row=2, column=cluster_column).value = "Duplicate Cluster"
+    counts = issue_counts(self.issue_bits)
+    for i, count in counts[counts > 0].items():
+      self.ws.cell(row=i, column=severity_column).value = int(count)
+    for i, cluster in self.duplicate_repeats().items():
+      self.ws.cell(row=i, column=cluster_column).value = int(cluster)
+
+    rule_count = add_severity_rules(
+        self.ws,
+        severity_column,
+        self.rows.first_row,
+        self.rows.max_row,
+        self.fill_cache,
+        cluster_column=cluster_column,
+        designator_column=self.column_index_map["Flr Pln D"])
+    print(f"Wrote {rule_count} conditional formatting rules")
+    logging.info(f"Wrote {rule_count} conditional formatting rules")
+    return None
+
+  def streaming_output(self):
+    # "streaming" and "flagged" never load the input workbook
+    return self.output_mode in ("streaming", "flagged")
+
+  def flagged_rows(self):
+    # Rows with an issue, a note or a highlighted cell
+    counts = issue_counts(self.issue_bits)
+    return (set(counts.index[counts > 0]) | set(self.issue_notes) |
+            {row_id for row_id, column_id in self.pending_fills} |
+            {row_id for row_id, column_id in self.duplicate_fills})
+
+  def stream_output_file(self):
+    # This function writes the sheet from the row store one row at a
+    # time, with the Issues text in place of "Department_ID" and the
+    # same fills highlight_Issues() paints. In "flagged" mode only the
+    # flagged rows are written, as a compact discrepancy workbook.
+    issue_text = self.render_issue_text()
+    counts = issue_counts(self.issue_bits)
+    row_colors = {
+        i: SEVERITY_COLORS[min(int(count), 3)]
+        for i, count in counts[counts > 0].items()
+    }
+    flagged = self.flagged_rows() if self.output_mode == "flagged" else None
+
+    def sheet_rows():
+      for i, values in enumerate(self.rows.leading_rows, start=1):
+        yield i, values
+      yield self.rows.header_row, self.rows.header
+      for i in self.rows.row_numbers():
+        if flagged is not None and i not in flagged:
+          continue
+        values = list(self.rows.row(i))
+        values[self.issueColumn - 1] = issue_text[i] or None
+        yield i, values
+
+    written = stream_workbook(self.output_file,
+                              sheet_rows(),
+                              self.fill_cache,
+                              row_colors=row_colors,
+                              cell_colors=self.pending_fills,
+                              override_colors=self.duplicate_fills,
+                              sheet_title=self.rows.sheet_title)
+    print(f"Streamed {written} rows. {self.fill_cache.report()}")
+    logging.info(f"Streamed {written} rows. {self.fill_cache.report()}")
+    return None
 
   def save_output_file(self):
     print(f"Beginning the determine_output_files(): {self.output_file}")
@@ -696,32 +787,60 @@ class DataProcessor:
         'log': 'logs'
     }.get(file_extension, 'ss')
 
+    # Add a copy number if the file already exists
     output_file_name = f"output_{current_datetime}.xlsx"
-    self.output_file = os.path.join(output_folder, file_type, output_file_name)
-
-    # Check if the output_file already exists
-    if os.path.exists(self.output_file):
-      # Add a copy number if the file already exists
-      copy_number = 1
-      while os.path.exists(self.output_file):
-        output_file_name = f"output_{current_datetime}_copy{copy_number}.xlsx"
-        self.output_file = os.path.join(output_folder, file_type,
-                                        output_file_name)
-        copy_number += 1
-
-    self.wb.save(self.output_file)
+    if self.output_mode == "flagged":
+      output_file_name = f"output_{current_datetime}_flagged.xlsx"
+    self.output_file = unique_output_file(
+        os.path.join(output_folder, file_type), output_file_name)
+
+    try:
+      if self.streaming_output():
+        self.stream_output_file()
+      else:
+        if self.output_mode == "conditional":
+          self.add_conditional_formatting()
+
+        # Written to a temporary file and renamed, so a crash mid-save
+        # never leaves a truncated output behind
+        save_workbook_atomic(self.wb, self.output_file)
+    except BaseException:
+      # Drop the empty placeholder reserving the name, so a failed save
+      # leaves no output at all
+      if os.path.exists(self.output_file):
+        os.remove(self.output_file)
+      raise
     print(f"Ending the save_output_file(): {self.output_file}")
     print(self.output_file)
     return None
 
 
-# Instantiate the DataProcessor class
-print("Starting the data the processor")
-data_processor = DataProcessor()
+  def save_sequence_report(self):
+    # Write the missing, repeated and out of range designator numbers of
+    # every floor plan and device class next to the output workbook.
+    # Incremental runs only report the floor plans they re-sequenced.
+    report = sequence_report(self.sequence_index)
+    if not report:
+      return None
+    current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_file = unique_output_file(
+        os.path.join('Outputs', 'reports'),
+        f"sequence_report_{current_datetime}.csv")
+    pd.DataFrame(report).to_csv(report_file, index=False)
+    not_sequential = sum(not line["Sequential"] for line in report)
+    print(f"Sequence report: {not_sequential} of {len(report)} floor plan "
+          f"device classes out of sequence, see {report_file}")
+    logging.info(f"Sequence report written to {report_file}")
+    return None
+
+if __name__ == "__main__":
+  # Instantiate the DataProcessor class
+  print("Starting the data the processor")
+  data_processor = DataProcessor()
 
-# Call the process_data method on the instance
-data_processor.process_data()
+  # Call the process_data method on the instance
+  data_processor.process_data()
 
-print("After calling the process_data method on the instance")
-# Configure logging to write messages/logs to a file
-logging.basicConfig(filename='data_processing.log', level=print)
+  print("After calling the process_data method on the instance")
+  # Configure logging to write messages/logs to a file
+  logging.basicConfig(filename='data_processing.log', level=print)
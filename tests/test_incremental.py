@@ -0,0 +1,38 @@
+import os
+
+from openpyxl import load_workbook
+
+from sequencing_85_percent import DataProcessor
+
+SAMPLE_WORKBOOK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'PBMC EOD 12.19.23.xlsx')
+
+
+def run(incremental):
+  # Process the sample export and return the output workbook path
+  data_processor = DataProcessor(SAMPLE_WORKBOOK)
+  data_processor.incremental = incremental
+  data_processor.process_data()
+  return data_processor.output_file
+
+
+def sheet_cells(output_file):
+  # Value and fill colour of every cell of the output sheet
+  ws = load_workbook(output_file).active
+  return [[(cell.value, cell.fill.fgColor.rgb) for cell in row]
+          for row in ws.iter_rows()]
+
+
+def test_unchanged_export_matches_full_run(tmp_path, monkeypatch):
+  # Outputs, snapshots and caches are written under the working directory
+  monkeypatch.chdir(tmp_path)
+  full = sheet_cells(run(incremental=False))
+
+  # The first incremental run stores the results, the second finds
+  # every row unchanged and reuses them
+  first = sheet_cells(run(incremental=True))
+  second = sheet_cells(run(incremental=True))
+
+  assert first == full
+  assert second == full